@@ -0,0 +1,87 @@
+# Benchmarks whole-map queries answered by looping over Game.tiles against the
+# same queries as masks over BoardArrays (games/stumped/board_arrays.py), and
+# what keeping the arrays up to date adds to merging each delta.
+#
+# Needs NumPy. Run from the root of the client:
+#     python3 -m benchmarks.board_arrays [--width 100] [--height 100]
+
+import argparse
+import time
+from joueur.game_manager import GameManager
+from games.stumped import Game
+from games.stumped.ai import droppable, permablocked
+from benchmarks.delta_merge import CONSTANTS, played_game
+
+
+def loop_queries(game):
+    tiles = game.tiles
+    opponent = game.players[1]
+    return (
+        [tile for tile in tiles if tile.spawner and tile.spawner.health > 1 and tile.spawner.type == 'branches'],
+        [tile for tile in tiles if tile.lodge_owner is opponent],
+        [tile for tile in tiles if tile.is_pathable()],
+        [tile for tile in tiles if droppable(tile)],
+        [tile for tile in tiles if permablocked(tile)],
+    )
+
+
+def array_queries(game):
+    arrays = game.board_arrays()
+    opponent = game.players[1]
+    return (
+        arrays.tiles_where(arrays.spawners('branches', min_health=1)),
+        arrays.tiles_where(arrays.lodges(opponent)),
+        arrays.tiles_where(arrays.pathable()),
+        arrays.tiles_where(arrays.droppable()),
+        arrays.tiles_where(arrays.permablocked()),
+    )
+
+
+def merge(deltas, arrays):
+    game = Game()
+    manager = GameManager(game)
+    manager.set_constants(CONSTANTS)
+    manager.apply_delta_state(deltas[0])
+    if arrays:
+        game.board_arrays()
+    start = time.perf_counter()
+    for delta in deltas[1:]:
+        manager.apply_delta_state(delta)
+    return game, time.perf_counter() - start
+
+
+def timed(function, game, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(game)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks whole-map queries over tiles against BoardArrays.')
+    parser.add_argument('--width', type=int, default=100, help='the width of the map')
+    parser.add_argument('--height', type=int, default=100, help='the height of the map')
+    parser.add_argument('--turns', type=int, default=100, help='the number of turns to play')
+    parser.add_argument('--repeat', type=int, default=10, help='the number of times to time each, the best is reported')
+    args = parser.parse_args()
+
+    deltas = played_game(args.width, args.height, args.turns)
+    game, plain = merge(deltas, False)
+    mirrored_game, mirrored = merge(deltas, True)
+    assert loop_queries(game) == loop_queries(mirrored_game) == array_queries(mirrored_game), \
+        'the loops and the arrays disagree'
+
+    per_delta = 1e6 / max(1, len(deltas) - 1)
+    print('{}x{} map, {} deltas'.format(args.width, args.height, len(deltas) - 1))
+    print('merging: {:7.1f} us per delta, {:7.1f} us keeping the arrays up to date'.format(
+        plain * per_delta, mirrored * per_delta))
+    print('queries: loops {:7.3f} ms, arrays {:7.3f} ms'.format(
+        timed(loop_queries, mirrored_game, args.repeat) * 1000,
+        timed(array_queries, mirrored_game, args.repeat) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# Benchmarks encoding and decoding Stumped frames with each installed codec,
+# broken down by the kind of frame so it is clear where decode time goes.
+#
+# Run from the root of the client:
+#     python3 -m benchmarks.codec [--tiles 10000] [--frames FILE]
+#
+# FILE is a session log recorded with `main.py --record FILE`, or frames as
+# received from the server separated by EOT (\x04).
+
+import argparse
+import json
+import time
+from joueur.codec import codecs
+from joueur.session_log import MAGIC, RECEIVED, read_session_log
+from benchmarks.frame_decoder import synthetic_state
+
+
+def synthetic_frames(num_tiles):
+    """Frames shaped like the traffic of a Stumped game."""
+    state = synthetic_state(num_tiles)
+    turn_delta = {
+        'event': 'delta',
+        'data': {
+            'currentTurn': 17,
+            'gameObjects': {
+                str(i): {'branches': i % 4, 'beaver': {'id': str(i + 1)}}
+                for i in range(0, 60, 3)
+            },
+        },
+    }
+    ran = {'event': 'ran', 'data': True}
+    run = {
+        'sentTime': 1480000000,
+        'event': 'run',
+        'data': {
+            'caller': {'id': '12'},
+            'functionName': 'move',
+            'args': {'tile': {'id': '345'}},
+        },
+    }
+    return [
+        ('initial delta', json.dumps(state)),
+        ('turn delta', json.dumps(turn_delta)),
+        ('ran', json.dumps(ran)),
+        ('run', json.dumps(run)),
+    ]
+
+
+def recorded_frames(path):
+    with open(path, 'rb') as f:
+        is_session_log = f.read(len(MAGIC)) == MAGIC
+
+    if is_session_log:
+        frames = [frame.decode('utf-8') for direction, _, frame
+                  in read_session_log(path) if direction == RECEIVED]
+    else:
+        with open(path, 'rb') as f:
+            frames = f.read().decode('utf-8').split(chr(4))
+
+    kinds = {}
+    for frame in frames:
+        if frame:
+            kinds.setdefault(json.loads(frame).get('event'), []).append(frame)
+    return [(kind, frame) for kind, group in sorted(kinds.items()) for frame in group]
+
+
+def timed(function, argument, min_time=0.2):
+    """Best seconds per call of function(argument)."""
+    best = None
+    spent = 0.0
+    while spent < min_time:
+        start = time.perf_counter()
+        function(argument)
+        elapsed = time.perf_counter() - start
+        spent += elapsed
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the codecs used to talk to the server.')
+    parser.add_argument('--tiles', type=int, default=10000, help='the number of tiles in the synthetic initial state')
+    parser.add_argument('--frames', default=None, help='a session log (or file of EOT separated frames) to use instead of synthetic frames')
+    args = parser.parse_args()
+
+    frames = recorded_frames(args.frames) if args.frames else synthetic_frames(args.tiles)
+
+    available = []
+    for name, codec_class in codecs.items():
+        try:
+            available.append(codec_class())
+        except ImportError:
+            print('{} is not installed, skipping it'.format(name))
+
+    totals = {}
+    for codec in available:
+        for kind, frame in frames:
+            obj = json.loads(frame)
+            assert codec.loads(frame) == obj
+            assert json.loads(codec.dumps(obj).decode('utf-8')) == obj
+
+            decode = timed(codec.loads, frame)
+            encode = timed(codec.dumps, obj)
+            total = totals.setdefault((codec.name, kind), [0, 0.0, 0.0])
+            total[0] += len(frame.encode('utf-8'))
+            total[1] += decode
+            total[2] += encode
+
+    print('{:>8} {:>14} {:>12} {:>12} {:>12} {:>12}'.format(
+        'codec', 'frames', 'bytes', 'decode s', 'decode MiB/s', 'encode MiB/s'))
+    for (name, kind), (size, decode, encode) in totals.items():
+        print('{:>8} {:>14} {:>12} {:>12.6f} {:>12.1f} {:>12.1f}'.format(
+            name, kind, size, decode,
+            size / (1 << 20) / decode, size / (1 << 20) / encode))
+
+
+if __name__ == '__main__':
+    main()
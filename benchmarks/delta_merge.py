@@ -0,0 +1,181 @@
+# Benchmarks merging deltas into the game, comparing:
+#     old: the generic recursive merge, converting every key's case as it goes
+#     new: GameManager's per-class appliers, built once per class
+# on a full initial state and on the deltas of a game played by random moves
+# on the local server's rules (games/stumped/local_server.py).
+#
+# Run from the root of the client:
+#     python3 -m benchmarks.delta_merge [--width 32] [--height 20] [--turns 100]
+
+import argparse
+import copy
+import json
+import random
+import time
+from joueur.delta_mergeable import DeltaMergeable
+from joueur.game_manager import GameManager
+from joueur.serializer import is_game_object_reference, is_object, serialize
+from joueur.slots import fields_of
+from joueur.utilities import camel_case_converter
+from games.stumped import Game
+from games.stumped.local_server import (
+    DELTA_LIST_LENGTH, DELTA_REMOVED, InvalidCommand, StumpedGame)
+
+CONSTANTS = {'DELTA_REMOVED': DELTA_REMOVED, 'DELTA_LIST_LENGTH': DELTA_LIST_LENGTH}
+
+
+class LegacyGameManager(GameManager):
+    """The merge as it was: recursive, converting each key's case, and
+    deleting the list length keys out of the delta as it goes."""
+
+    def _set_member(self, state, state_key, value):
+        if isinstance(state_key, int) or isinstance(state, dict):
+            state[state_key] = value
+        else:
+            setattr(state, state_key, value)
+
+    def _merge_delta(self, state, delta):
+        delta_length = -1
+        if self._DELTA_LIST_LENGTH in delta:
+            delta_length = delta[self._DELTA_LIST_LENGTH]
+            del delta[self._DELTA_LIST_LENGTH]
+
+        if delta_length > -1:
+            while len(state) > delta_length:
+                state.pop()
+            while len(state) < delta_length:
+                state.append(None)
+
+        for key in delta:
+            d = delta[key]
+            state_key = key
+            key_in_state = False
+
+            if isinstance(state, list):
+                state_key = int(key)
+                key_in_state = state_key < len(state)
+            else:
+                if isinstance(state, DeltaMergeable):
+                    state_key = "_" + camel_case_converter(state_key)
+                key_in_state = state_key in state
+
+            if d == self._DELTA_REMOVED:
+                if key_in_state:
+                    del state[state_key]
+            elif is_game_object_reference(d):
+                referenced_object = self.game.get_game_object(d['id'])
+                self._set_member(state, state_key, referenced_object)
+            elif is_object(d) and key_in_state and is_object(state[state_key]):
+                self._merge_delta(state[state_key], d)
+            elif not key_in_state and is_object(d):
+                if isinstance(d, dict):
+                    state[state_key] = [] if self._DELTA_LIST_LENGTH in d else {}
+                    self._merge_delta(state[state_key], d)
+            else:
+                self._set_member(state, state_key, d)
+
+
+def played_game(width, height, turns, seed=1):
+    """The initial state and every delta after it of a game where both
+    players recruit, move, harvest and build at random."""
+    rng = random.Random(seed)
+    game = StumpedGame('bench', ['a', 'b'], width, height, turns * 2, seed=seed)
+    deltas = [game.pop_delta()]
+
+    def run(player, caller, function_name, **args):
+        try:
+            game.run(player, caller, function_name,
+                     {key: serialize_reference(value) for key, value in args.items()})
+        except InvalidCommand:
+            return
+        delta = game.pop_delta()
+        if delta:
+            deltas.append(delta)
+
+    for _ in range(turns):
+        if game.over:
+            break
+        player = game.current_player
+        run(player, rng.choice(game.jobs), 'recruit', tile=player.lodges[0])
+        for beaver in list(player.beavers):
+            neighbors = [game.tile_at(beaver.tile.x + dx, beaver.tile.y + dy)
+                         for dx, dy in ((0, -1), (1, 0), (0, 1), (-1, 0))]
+            run(player, beaver, 'move', tile=rng.choice([t for t in neighbors if t]))
+            spawner = beaver.tile.spawner
+            if spawner:
+                run(player, beaver, 'harvest', spawner=spawner)
+            if beaver.branches:
+                run(player, beaver, 'buildLodge')
+        game.end_turn()
+        delta = game.pop_delta()
+        if delta:
+            deltas.append(delta)
+
+    # what the client would parse off the wire
+    return [json.loads(json.dumps(delta)) for delta in deltas]
+
+
+def serialize_reference(value):
+    return {'id': value.id} if hasattr(value, 'gameObjectName') else value
+
+
+def state_of(game):
+    """Every field of every game object, with references as ids."""
+    def fields(obj):
+        return {key: serialize(value) for key, value in fields_of(obj).items()
+                if key != '_client'}
+    state = {id: fields(obj) for id, obj in game._game_objects.items()}
+    state[None] = {key: serialize(value) for key, value in fields(game).items()
+                   if key not in ('_game_objects', '_game_object_classes', '_last_changes', '_indexes',
+                                  '_game_objects_by_index', '_tombstones', '_occupancy_version')}
+    return state
+
+
+def merge_all(manager_class, deltas):
+    """Seconds to merge the initial state, and to merge the rest, into a new game."""
+    game = Game()
+    manager = manager_class(game)
+    manager.set_constants(CONSTANTS)
+
+    start = time.perf_counter()
+    manager.apply_delta_state(deltas[0])
+    initial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for delta in deltas[1:]:
+        manager.apply_delta_state(delta)
+    return initial, time.perf_counter() - start, game
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks merging deltas into the game.')
+    parser.add_argument('--width', type=int, default=32, help='the width of the map')
+    parser.add_argument('--height', type=int, default=20, help='the height of the map')
+    parser.add_argument('--turns', type=int, default=100, help='the number of turns to play')
+    parser.add_argument('--repeat', type=int, default=5, help='the number of times to merge the game, the best is reported')
+    args = parser.parse_args()
+
+    deltas = played_game(args.width, args.height, args.turns)
+    print('{}x{} map: initial state of {} bytes, then {} deltas averaging {:.0f} bytes'.format(
+        args.width, args.height, len(json.dumps(deltas[0])), len(deltas) - 1,
+        sum(len(json.dumps(d)) for d in deltas[1:]) / max(1, len(deltas) - 1)))
+
+    unchanged = copy.deepcopy(deltas)
+    _, _, new_game = merge_all(GameManager, deltas)
+    assert deltas == unchanged, 'the deltas were changed by merging them'
+    _, _, old_game = merge_all(LegacyGameManager, copy.deepcopy(deltas))
+    assert state_of(new_game) == state_of(old_game), 'the merges disagree'
+
+    for name, manager_class in (('old', LegacyGameManager), ('new', GameManager)):
+        best_initial = best_turns = None
+        for _ in range(args.repeat):
+            # the old merge deletes keys out of what it merges
+            initial, turns, _ = merge_all(manager_class, copy.deepcopy(deltas))
+            best_initial = initial if best_initial is None else min(best_initial, initial)
+            best_turns = turns if best_turns is None else min(best_turns, turns)
+        print('{}: initial state {:8.3f} ms, per-turn deltas {:7.1f} us each'.format(
+            name, best_initial * 1000, best_turns / max(1, len(deltas) - 1) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Benchmarks DistanceFields (games/stumped/distance_field.py) against running
+# A* (PathFinder) for each beaver, when every beaver on the map heads for the
+# same goals: a player's lodges, as hunters head for, or the branch spawners.
+# Checks each field's path costs the same as A*'s, as ties may make them
+# different paths.
+#
+# Run from the root of the client:
+#     python3 -m benchmarks.distance_field [--sizes 20 50 100 200] [--beavers 20] [--goals lodges]
+
+import argparse
+import random
+import time
+from games.stumped.ai import move_cost
+from games.stumped.distance_field import DistanceFields
+from games.stumped.graph import Graph
+from games.stumped.path_finder import PathFinder
+from benchmarks.find_path import game_of
+
+
+def cost_of(path):
+    """What moving along a path costs, up to next to its goal."""
+    return sum(move_cost(start, end) for start, end in zip(path[:-2], path[1:-1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks shared distance fields against A* per beaver.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 50, 100, 200], help='the widths (and heights) of the maps')
+    parser.add_argument('--beavers', type=int, default=20, help='the beavers finding a path to the same goals')
+    parser.add_argument('--goals', choices=['lodges', 'spawners'], default='lodges', help='what the beavers head for')
+    parser.add_argument('--turns', type=int, default=20, help='turns played on each map first')
+    args = parser.parse_args()
+
+    print('{:>9} {:>10} {:>10} {:>10} {:>8}'.format('map', 'A* ms', 'field ms', 'cached ms', 'speedup'))
+    for size in args.sizes:
+        game = game_of(size, args.turns)
+        rng = random.Random(size)
+        starts = [[tile] for tile in rng.sample(game.tiles, args.beavers)]
+        if args.goals == 'lodges':
+            goals = list(game.lodges_of(game.players[1]))
+        else:
+            goals = [spawner.tile for spawner in game.spawners_of('branches')]
+
+        graph = Graph(game, move_cost)
+        finder = PathFinder(graph)
+        fields = DistanceFields(graph)
+
+        start = time.perf_counter()
+        expected = [finder.find_path(tiles, goals) for tiles in starts]
+        astar = time.perf_counter() - start
+
+        start = time.perf_counter()
+        paths = [fields.find_path(tiles, goals) for tiles in starts]
+        field = time.perf_counter() - start
+
+        # the next turn's, had no beaver moved
+        start = time.perf_counter()
+        for tiles in starts:
+            fields.find_path(tiles, goals)
+        cached = time.perf_counter() - start
+
+        for path, expected_path in zip(paths, expected):
+            assert bool(path) == bool(expected_path) and cost_of(path) == cost_of(expected_path), \
+                'different costs from {} on {}x{}'.format(path[0] if path else None, size, size)
+
+        print('{:>9} {:>10.1f} {:>10.1f} {:>10.1f} {:>7.1f}x'.format(
+            '{}x{}'.format(size, size), astar * 1000, field * 1000, cached * 1000, astar / field))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# Benchmarks AI.find_path's A* over tile indexes (games/stumped/path_finder.py)
+# against the uniform cost search over Tile objects it replaced, on maps from
+# 20x20 to 200x200, from one start tile and from several, checking the two
+# find exactly the same paths.
+#
+# Run from the root of the client:
+#     python3 -m benchmarks.find_path [--sizes 20 50 100 200] [--queries 200]
+
+import argparse
+import heapq
+import random
+import time
+from collections import defaultdict
+from joueur.game_manager import GameManager
+from games.stumped import Game
+from games.stumped.ai import move_cost, pathable
+from games.stumped.graph import Graph
+from games.stumped.path_finder import PathFinder
+from benchmarks.delta_merge import CONSTANTS, played_game
+
+
+def uniform_cost_search(start_tiles, goal_tiles):
+    """AI.find_path as it was before PathFinder."""
+    open_q = [(0, tile) for tile in start_tiles]
+    heapq.heapify(open_q)
+    goals = {tile for tile in goal_tiles}
+    source = defaultdict(lambda: (None, 100000000))
+    for tile in start_tiles:
+        source[tile] = (tile, 0)
+    while open_q:
+        moves, working = heapq.heappop(open_q)
+        for neighbor in working.get_neighbors():
+            if neighbor in goals:
+                steps = [neighbor, working]
+                previous = working
+                while source[previous][0] != previous:
+                    previous = source[previous][0]
+                    steps.append(previous)
+                return list(reversed(steps))
+            if not pathable(neighbor):
+                continue
+            previous_tile, previous_distance = source[neighbor]
+            current_distance = moves + move_cost(working, neighbor)
+            if current_distance < previous_distance:
+                source[neighbor] = (working, current_distance)
+                heapq.heappush(open_q, (current_distance, neighbor))
+    return []
+
+
+def game_of(size, turns):
+    game = Game()
+    manager = GameManager(game)
+    manager.set_constants(CONSTANTS)
+    for delta in played_game(size, size, turns):
+        manager.apply_delta_state(delta)
+    return game
+
+
+def queries(game, count, seed=1):
+    """(start tiles, goal tiles) like the AI's: from a beaver's tile, from
+    the free tiles around one tile, as around a lodge in
+    AI.try_move_off_lodge, or from a few tiles across the map, as from a
+    player's lodges in AI.spawn, to the branch spawners, to one tile, or to
+    any of a lot of them."""
+    rng = random.Random(seed)
+    starts = [beaver.tile for beaver in game.beavers if beaver.tile] or game.tiles
+    spawners = [spawner.tile for spawner in game.spawners_of('branches')]
+    result = []
+    for index in range(count):
+        kind = index % 3
+        if kind == 0:
+            goals = spawners
+        elif kind == 1:
+            goals = [rng.choice(game.tiles)]
+        else:
+            goals = rng.sample(game.tiles, min(100, len(game.tiles)))
+
+        kind = index // 3 % 3
+        if kind == 0:
+            start_tiles = [rng.choice(starts)]
+        elif kind == 1:
+            start_tiles = [tile for tile in rng.choice(game.tiles).get_neighbors() if pathable(tile)] or [rng.choice(starts)]
+        else:
+            start_tiles = rng.sample(game.tiles, rng.randint(2, 6))
+        result.append((start_tiles, goals))
+    return result
+
+
+def timed(function, tests):
+    start = time.perf_counter()
+    paths = [function(start_tiles, goal_tiles) for start_tiles, goal_tiles in tests]
+    return paths, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks A* against uniform cost search for AI.find_path.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 50, 100, 200], help='the widths (and heights) of the maps')
+    parser.add_argument('--queries', type=int, default=200, help='the paths to find on each map')
+    parser.add_argument('--turns', type=int, default=20, help='turns played on each map first')
+    args = parser.parse_args()
+
+    print('{:>9} {:>10} {:>10} {:>10} {:>8}'.format('map', 'UCS ms', 'A* ms', 'setup ms', 'speedup'))
+    for size in args.sizes:
+        game = game_of(size, args.turns)
+        tests = queries(game, args.queries)
+
+        start = time.perf_counter()
+        finder = PathFinder(Graph(game, move_cost))
+        setup = time.perf_counter() - start
+
+        expected, old = timed(uniform_cost_search, tests)
+        paths, new = timed(finder.find_path, tests)
+        for (start_tiles, goal_tiles), path, expected_path in zip(tests, paths, expected):
+            assert path == expected_path, 'different paths from {} on {}x{}'.format(start_tiles[0], size, size)
+
+        print('{:>9} {:>10.1f} {:>10.1f} {:>10.1f} {:>7.1f}x'.format(
+            '{}x{}'.format(size, size), old * 1000, new * 1000, setup * 1000, old / new))
+
+
+if __name__ == '__main__':
+    main()
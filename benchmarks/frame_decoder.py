@@ -0,0 +1,114 @@
+# Benchmarks the client's receive path: feeds a multi-megabyte synthetic
+# Stumped state through the old str based splitting and the FrameDecoder.
+#
+# Run from the root of the client:
+#     python3 -m benchmarks.frame_decoder [--tiles 10000] [--chunk 1024]
+
+import argparse
+import json
+import time
+from joueur.frame_decoder import FrameDecoder
+
+EOT_CHAR = chr(4)
+
+
+def synthetic_state(num_tiles):
+    """Builds a delta shaped like the initial Stumped state, with multibyte
+    characters sprinkled in so some land on chunk boundaries."""
+    game_objects = {}
+    width = int(num_tiles ** 0.5) or 1
+    for i in range(num_tiles):
+        x, y = i % width, i // width
+        game_objects[str(i)] = {
+            'gameObjectName': 'Tile',
+            'id': str(i),
+            'logs': {'&LEN': 1, '0': 'placé ☃ {}'.format(i)},
+            'x': x,
+            'y': y,
+            'type': 'water' if (x + y) % 7 == 0 else 'land',
+            'flowDirection': 'North' if (x + y) % 7 == 0 else '',
+            'branches': i % 5,
+            'food': i % 3,
+            'beaver': None,
+            'lodgeOwner': None,
+            'spawner': None,
+            'tileNorth': {'id': str(i - width)} if y > 0 else None,
+            'tileEast': {'id': str(i + 1)} if x + 1 < width else None,
+            'tileSouth': {'id': str(i + width)},
+            'tileWest': {'id': str(i - 1)} if x > 0 else None,
+        }
+    return {
+        'sentTime': 0,
+        'event': 'delta',
+        'data': {
+            'gameObjects': game_objects,
+            'tiles': {'&LEN': num_tiles},
+        },
+    }
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def split_str(chunks):
+    """The old receive path: decode each chunk, then rebuild and split the
+    whole buffer on every read."""
+    frames = []
+    received_buffer = ''
+    for chunk in chunks:
+        split = (received_buffer + chunk.decode('utf-8', 'replace')).split(
+            EOT_CHAR)
+        received_buffer = split.pop()
+        frames.extend(split)
+    return frames
+
+
+def split_bytes(chunks):
+    frames = []
+    decoder = FrameDecoder()
+    for chunk in chunks:
+        frames.extend(decoder.feed(chunk))
+    return frames
+
+
+def timed(function, chunks, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frames = function(chunks)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks decoding frames received from the server.')
+    parser.add_argument('--tiles', type=int, default=10000, help='the number of tiles in the synthetic state')
+    parser.add_argument('--chunk', type=int, default=1024, help='the number of bytes per socket read')
+    parser.add_argument('--repeat', type=int, default=3, help='how many times to run each decoder, keeping the best')
+    args = parser.parse_args()
+
+    state = json.dumps(synthetic_state(args.tiles), ensure_ascii=False)
+    small = json.dumps({'sentTime': 0, 'event': 'ran', 'data': True})
+    data = ((state + EOT_CHAR) + (small + EOT_CHAR) * 200).encode('utf-8')
+    chunks = chunked(data, args.chunk)
+
+    print('{:.1f} MiB in {} chunks of {} bytes'.format(
+        len(data) / (1 << 20), len(chunks), args.chunk))
+
+    old_time, old_frames = timed(split_str, chunks, args.repeat)
+    new_time, new_frames = timed(split_bytes, chunks, args.repeat)
+
+    # the old path mangles characters split across chunks, the new one must not
+    assert new_frames[0] == state and len(new_frames) == 201
+    print('old path mangled frames: {}'.format(
+        sum(1 for a, b in zip(old_frames, new_frames) if a != b)))
+
+    for name, elapsed in (('str split', old_time), ('FrameDecoder', new_time)):
+        print('{:>14}: {:8.3f} s {:8.1f} MiB/s'.format(
+            name, elapsed, len(data) / (1 << 20) / elapsed))
+
+
+if __name__ == '__main__':
+    main()
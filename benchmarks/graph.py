@@ -0,0 +1,84 @@
+# Benchmarks the AI's searches on the map's Graph (games/stumped/graph.py),
+# with every move's cost worked out once, against the same searches working
+# out move_cost and pathable from the Tiles on every move: building the
+# closer_to_me and closer_to_them sets (AI.set_nearest_beaver), and
+# AI.find_path. Checks both find the same.
+#
+# Run from the root of the client:
+#     python3 -m benchmarks.graph [--sizes 20 50 100 200]
+
+import argparse
+import heapq
+import time
+from collections import defaultdict
+from math import ceil
+from games.stumped import AI
+from games.stumped.ai import move_cost, pathable
+from benchmarks.find_path import game_of, queries, uniform_cost_search
+
+
+def nearest_beaver_by_tiles(ai):
+    """AI.set_nearest_beaver as it was before the Graph."""
+    open_q = [(0, beaver.tile, beaver) for beaver in ai.game.beavers]
+    heapq.heapify(open_q)
+    source = defaultdict(lambda: (None, 100000000))
+    for beaver in ai.game.beavers:
+        source[beaver.tile] = (beaver, 0)
+    while open_q:
+        moves, working, beaver = heapq.heappop(open_q)
+        for neighbor in working.get_neighbors():
+            previous_beaver, previous_distance = source[neighbor]
+            current_distance = moves + move_cost(working, neighbor)
+            if previous_beaver is None or ceil(current_distance / beaver.job.moves) < ceil(previous_distance / previous_beaver.job.moves):
+                source[neighbor] = (beaver, current_distance)
+                if pathable(neighbor):
+                    heapq.heappush(open_q, (current_distance, neighbor, beaver))
+    closer_to_me = set()
+    closer_to_them = set()
+    for tile in ai.game.tiles:
+        beaver, _ = source[tile]
+        if not beaver:
+            continue
+        if beaver.owner == ai.player:
+            closer_to_me.add(tile)
+        else:
+            closer_to_them.add(tile)
+    return closer_to_me, closer_to_them
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the AI\'s searches on the Graph against on the Tiles.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 50, 100, 200], help='the widths (and heights) of the maps')
+    parser.add_argument('--queries', type=int, default=200, help='the paths to find on each map')
+    parser.add_argument('--turns', type=int, default=20, help='turns played on each map first')
+    args = parser.parse_args()
+
+    print('{:>9} {:>10} {:>18} {:>10} {:>18} {:>12}'.format(
+        'map', 'build ms', 'nearest: tiles ms', 'graph ms', 'find_path: UCS ms', 'graph A* ms'))
+    for size in args.sizes:
+        game = game_of(size, args.turns)
+        ai = AI(game)
+        ai.set_player(game.players[0])
+
+        _, build = timed(ai.graph)
+        expected, by_tiles = timed(nearest_beaver_by_tiles, ai)
+        _, by_graph = timed(ai.set_nearest_beaver)
+        assert (ai.closer_to_me, ai.closer_to_them) == expected, 'different nearest beavers on {}x{}'.format(size, size)
+
+        tests = queries(game, args.queries)
+        expected_paths, ucs = timed(lambda: [uniform_cost_search(*test) for test in tests])
+        paths, astar = timed(lambda: [ai.find_path(*test) for test in tests])
+        assert paths == expected_paths, 'different paths on {}x{}'.format(size, size)
+
+        print('{:>9} {:>10.1f} {:>18.1f} {:>10.1f} {:>18.1f} {:>12.1f}'.format(
+            '{}x{}'.format(size, size), build * 1000, by_tiles * 1000, by_graph * 1000, ucs * 1000, astar * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# Benchmarks encoding 'run' frames for the hot game object calls through the
+# generic serialize + json path, with each installed codec, and through the
+# cached frame templates, which build the JSON themselves without a codec.
+#
+# Run from the root of the client:
+#     python3 -m benchmarks.serializer [--calls 100000]
+
+import argparse
+import json
+import time
+from joueur.codec import codecs
+from joueur.serializer import serialize, encode_run
+from games.stumped import Beaver, Job, Spawner, Tile
+
+
+def game_object(cls, id):
+    obj = cls()
+    obj._id = id
+    obj._game_object_name = cls.__name__
+    return obj
+
+
+def generic(codec, sent_time, caller, function_name, args):
+    return codec.dumps({
+        'sentTime': sent_time,
+        'event': 'run',
+        'data': serialize({
+            'caller': caller,
+            'functionName': function_name,
+            'args': args,
+        }),
+    })
+
+
+def templated(sent_time, caller, function_name, args):
+    return encode_run(sent_time, caller, function_name, args).encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks encoding commands sent to the server.')
+    parser.add_argument('--calls', type=int, default=100000, help='the number of commands to encode per path')
+    args = parser.parse_args()
+
+    beavers = [game_object(Beaver, str(i)) for i in range(20)]
+    tiles = [game_object(Tile, str(100 + i)) for i in range(400)]
+    spawner = game_object(Spawner, '600')
+    job = game_object(Job, '700')
+    calls = [
+        (beavers[0], 'move', {'tile': tiles[1]}),
+        (beavers[1], 'attack', {'beaver': beavers[2]}),
+        (beavers[3], 'harvest', {'spawner': spawner}),
+        (beavers[4], 'drop', {'tile': tiles[5], 'resource': 'branches', 'amount': 3}),
+        (beavers[5], 'pickup', {'tile': tiles[6], 'resource': 'food', 'amount': 0}),
+        (beavers[6], 'buildLodge', {}),
+        (job, 'recruit', {'tile': tiles[7]}),
+        (tiles[8], 'log', {'message': 'café "quoted"\n'}),
+    ]
+
+    def timed(path):
+        start = time.perf_counter()
+        for i in range(args.calls):
+            caller, function_name, call_args = calls[i % len(calls)]
+            path(1480000000, caller, function_name, call_args)
+        return (time.perf_counter() - start) / args.calls
+
+    for codec_class in codecs.values():
+        try:
+            codec = codec_class()
+        except ImportError:
+            continue
+
+        # both paths must send the same data
+        for caller, function_name, call_args in calls:
+            assert json.loads(generic(codec, 1, caller, function_name, call_args)) == \
+                json.loads(templated(1, caller, function_name, call_args))
+
+        elapsed = timed(lambda *run: generic(codec, *run))
+        print('{:>8} {:>8}: {:7.3f} us per command'.format(codec.name, 'generic', elapsed * 1e6))
+
+    # the same whichever codec is installed
+    print('{:>8} {:>8}: {:7.3f} us per command'.format('-', 'template', timed(templated) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
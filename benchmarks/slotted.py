@@ -0,0 +1,87 @@
+# Benchmarks the memory and field reads of game objects created from the
+# plain game classes against their slotted variants (joueur/slots.py).
+#
+# Run from the root of the client:
+#     python3 -m benchmarks.slotted [--width 100] [--height 100]
+
+import argparse
+import time
+import tracemalloc
+from joueur.game_manager import GameManager
+from games.stumped import Game
+from benchmarks.delta_merge import CONSTANTS, played_game, state_of
+
+
+def merged_game(deltas, slotted):
+    game = Game()
+    manager = GameManager(game, slotted)
+    manager.set_constants(CONSTANTS)
+    for delta in deltas:
+        manager.apply_delta_state(delta)
+    return game
+
+
+def read_properties(tiles):
+    total = 0
+    for tile in tiles:
+        if tile.beaver is None and tile.spawner is None:
+            total += tile.x + tile.y + tile.branches
+    return total
+
+
+def read_fields(tiles):
+    total = 0
+    for tile in tiles:
+        if tile._beaver is None and tile._spawner is None:
+            total += tile._x + tile._y + tile._branches
+    return total
+
+
+def walk_neighbors(tiles):
+    """The inner loop of a path search."""
+    count = 0
+    for tile in tiles:
+        for neighbor in tile.get_neighbors():
+            if neighbor.is_pathable():
+                count += 1
+    return count
+
+
+def timed(function, argument, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks plain against slotted game objects.')
+    parser.add_argument('--width', type=int, default=100, help='the width of the map')
+    parser.add_argument('--height', type=int, default=100, help='the height of the map')
+    parser.add_argument('--repeat', type=int, default=10, help='the number of times to time each read, the best is reported')
+    args = parser.parse_args()
+
+    deltas = played_game(args.width, args.height, 20)
+    assert state_of(merged_game(deltas, False)) == state_of(merged_game(deltas, True)), \
+        'plain and slotted games disagree'
+
+    print('{}x{} map'.format(args.width, args.height))
+    for name, slotted in (('plain', False), ('slotted', True)):
+        tracemalloc.start()
+        game = merged_game(deltas, slotted)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        tiles = game.tiles
+        print('{:>8}: {:6.2f} MiB, reading properties {:6.2f} ms, fields {:6.2f} ms, neighbors {:6.2f} ms'.format(
+            name, memory / (1 << 20),
+            timed(read_properties, tiles, args.repeat) * 1000,
+            timed(read_fields, tiles, args.repeat) * 1000,
+            timed(walk_neighbors, tiles, args.repeat) * 1000))
+
+
+if __name__ == '__main__':
+    main()
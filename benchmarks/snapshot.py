@@ -0,0 +1,76 @@
+# Benchmarks trying out a plan on a copy of the game state, comparing:
+#     deepcopy: copy.deepcopy of the whole game, then changing the copy
+#     snapshot: BaseGame.snapshot(), changing the live state, then rolling back
+#
+# Run from the root of the client:
+#     python3 -m benchmarks.snapshot [--width 32] [--height 20] [--writes 50]
+
+import argparse
+import copy
+import sys
+import time
+from joueur.game_manager import GameManager
+from games.stumped import Game
+from benchmarks.delta_merge import CONSTANTS, played_game, state_of
+
+
+def plan(game, beavers, tiles, writes, set_field, mutable_field):
+    """Moves beavers around and piles branches, as an AI trying a plan might."""
+    for i in range(writes):
+        beaver = beavers[i % len(beavers)]
+        tile = tiles[(i * 7) % len(tiles)]
+        set_field(beaver.tile, 'beaver', None)
+        set_field(beaver, 'tile', tile)
+        set_field(tile, 'beaver', beaver)
+        set_field(tile, 'branches', tile.branches + 1)
+    mutable_field(game, 'beavers').pop()
+
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks trying out changes to the game state.')
+    parser.add_argument('--width', type=int, default=32, help='the width of the map')
+    parser.add_argument('--height', type=int, default=20, help='the height of the map')
+    parser.add_argument('--writes', type=int, default=50, help='the number of moves in the plan')
+    parser.add_argument('--repeat', type=int, default=20, help='the number of times to try the plan, the best is reported')
+    args = parser.parse_args()
+
+    game = Game()
+    manager = GameManager(game)
+    manager.set_constants(CONSTANTS)
+    for delta in played_game(args.width, args.height, 60):
+        manager.apply_delta_state(delta)
+    before = state_of(game)
+    sys.setrecursionlimit(100000)  # deepcopy recurses through every neighboring tile
+
+    def with_deepcopy():
+        game_copy = copy.deepcopy(game)
+        plan(game_copy, game_copy.beavers, game_copy.tiles, args.writes,
+             lambda obj, field, value: setattr(obj, '_' + field, value),
+             lambda obj, field: getattr(obj, '_' + field))
+
+    def with_snapshot():
+        with game.snapshot():
+            plan(game, game.beavers, game.tiles, args.writes,
+                 game.set_field, game.mutable_field)
+
+    with_snapshot()
+    assert state_of(game) == before, 'rolling back did not restore the game'
+
+    print('{} game objects, {} beavers, a plan of {} moves'.format(
+        len(game.game_objects), len(game.beavers), args.writes))
+    for name, function in (('deepcopy', with_deepcopy), ('snapshot', with_snapshot)):
+        print('{:>8}: {:9.3f} ms per plan'.format(name, timed(function, args.repeat) * 1000))
+
+
+if __name__ == '__main__':
+    main()
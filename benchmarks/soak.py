@@ -0,0 +1,110 @@
+# Soaks the client in a long, high churn game and reports its memory as it
+# goes. On the map of a real initial state, each turn a beaver is recruited,
+# an old one dies, beavers dead for a while are removed from the game, and the
+# player logs a few messages, for thousands of turns. Memory should stay flat
+# once the logs are capped (GameManager's max_logs) and removed game objects
+# fall out of the tombstones.
+#
+# Run from the root of the client:
+#     python3 -m benchmarks.soak [--turns 5000] [--maxLogs 1000]
+
+import argparse
+import random
+import time
+import tracemalloc
+from joueur.game_manager import GameManager
+from games.stumped import Game
+from benchmarks.delta_merge import CONSTANTS, played_game
+
+REMOVED = CONSTANTS['DELTA_REMOVED']
+LENGTH = CONSTANTS['DELTA_LIST_LENGTH']
+
+
+def churn(initial, turns, living, keep_dead, logs_per_turn, seed=1):
+    """Yields the delta of each turn after the initial state."""
+    rng = random.Random(seed)
+    objects = initial['gameObjects']
+    players = [reference['id'] for key, reference in initial['players'].items() if key != LENGTH]
+    tiles = [reference['id'] for key, reference in initial['tiles'].items() if key != LENGTH]
+    job = initial['jobs']['0']['id']
+    next_id = max(int(id) for id in objects) + 1
+
+    beavers = {player: [] for player in players}  # the ids in each player's list
+    died = {}  # beaver id -> the turn it died
+    logs = {player: 0 for player in players}
+
+    for turn in range(turns):
+        player = players[turn % 2]
+        game_objects = {}
+
+        id = str(next_id)
+        next_id += 1
+        game_objects[id] = {'id': id, 'gameObjectName': 'Beaver', 'health': 5,
+                            'owner': {'id': player}, 'job': {'id': job},
+                            'tile': {'id': rng.choice(tiles)}, 'logs': {LENGTH: 0}}
+        beavers[player].append(id)
+
+        alive = [beaver for beaver in beavers[player] if beaver not in died]
+        if len(alive) > living:
+            game_objects[alive[0]] = {'health': 0}
+            died[alive[0]] = turn
+
+        for beaver in [beaver for beaver in beavers[player] if turn - died.get(beaver, turn) > keep_dead]:
+            game_objects[beaver] = REMOVED
+            beavers[player].remove(beaver)
+            del died[beaver]
+
+        player_delta = {'beavers': {str(index): {'id': beaver} for index, beaver in enumerate(beavers[player])}}
+        player_delta['beavers'][LENGTH] = len(beavers[player])
+        player_delta['logs'] = {str(logs[player] + index): 'turn {} message {}'.format(turn, index)
+                                for index in range(logs_per_turn)}
+        logs[player] += logs_per_turn
+        player_delta['logs'][LENGTH] = logs[player]
+        game_objects[player] = player_delta
+
+        yield {'currentTurn': turn + 1, 'gameObjects': game_objects}
+
+
+def soak(initial, args, max_logs):
+    """The turn, memory in bytes, logs kept by the first player and tombstones, at every report."""
+    tracemalloc.start()
+    game = Game()
+    manager = GameManager(game, max_logs=max_logs)
+    manager.set_constants(CONSTANTS)
+    manager.apply_delta_state(initial)
+
+    reports = []
+    for turn, delta in enumerate(churn(initial, args.turns, args.living, args.keep_dead, args.logs), 1):
+        manager.apply_delta_state(delta)
+        if turn % args.every == 0:
+            reports.append((turn, tracemalloc.get_traced_memory()[0],
+                            len(game.players[0].logs), len(game._tombstones)))
+    tracemalloc.stop()
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reports memory through a long, high churn game.')
+    parser.add_argument('--turns', type=int, default=5000, help='the number of turns to play')
+    parser.add_argument('--every', type=int, default=1000, help='report every this many turns')
+    parser.add_argument('--living', type=int, default=5, help='the beavers each player keeps alive')
+    parser.add_argument('--keepDead', type=int, dest='keep_dead', default=10, help='turns dead beavers stay in the game before they are removed')
+    parser.add_argument('--logs', type=int, default=5, help='messages each player logs per turn')
+    parser.add_argument('--maxLogs', type=int, dest='max_logs', default=1000, help='the logs each game object keeps')
+    args = parser.parse_args()
+
+    initial = played_game(32, 20, 0)[0]
+    start = time.perf_counter()
+    capped = soak(initial, args, args.max_logs)
+    uncapped = soak(initial, args, None)
+    print('{} turns in {:.1f} s'.format(args.turns, time.perf_counter() - start))
+
+    print('{:>8} {:>14} {:>14} {:>10} {:>12}'.format(
+        'turn', 'capped MiB', 'uncapped MiB', 'logs kept', 'tombstones'))
+    for (turn, memory, logs, tombstones), uncapped_report in zip(capped, uncapped):
+        print('{:>8} {:>14.2f} {:>14.2f} {:>10} {:>12}'.format(
+            turn, memory / (1 << 20), uncapped_report[1] / (1 << 20), logs, tombstones))
+
+
+if __name__ == '__main__':
+    main()
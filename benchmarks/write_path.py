@@ -0,0 +1,126 @@
+# Benchmarks the client's write path against a local server thread that
+# replies 'ran' to every 'run', comparing:
+#     old: one socket.send per frame, Nagle's algorithm left on
+#     new: frames coalesced into one sendall per step, TCP_NODELAY set
+#
+# Run from the root of the client:
+#     python3 -m benchmarks.write_path [--commands 2000] [--batch 10]
+
+import argparse
+import json
+import socket
+import threading
+import time
+from joueur.frame_decoder import FrameDecoder
+from joueur.transport import SocketTransport
+
+EOT_CHAR = chr(4)
+
+
+class LegacyTransport(SocketTransport):
+    """The write path as it was: no TCP_NODELAY and a bare send."""
+
+    def connect(self, hostname, port):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.settimeout(self._timeout_time)
+        self._socket.connect((hostname, port))
+
+    def send(self, data):
+        self._socket.send(data)
+
+
+def reply_server(listener):
+    """Replies to each 'run' frame with a delta and a 'ran', like the game
+    server would, until the client disconnects."""
+    while True:
+        connection, _ = listener.accept()
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        decoder = FrameDecoder()
+        reply = (json.dumps({'event': 'delta', 'data': {'currentTurn': 1}}) +
+                 EOT_CHAR + json.dumps({'event': 'ran', 'data': True}) +
+                 EOT_CHAR).encode('utf-8')
+        while True:
+            received = connection.recv(decoder.recv_size)
+            if not received:
+                break
+            runs = sum(1 for frame in decoder.feed(received)
+                       if json.loads(frame)['event'] == 'run')
+            if runs:
+                connection.sendall(reply * runs)
+        connection.close()
+
+
+def run_frame(index):
+    return (json.dumps({
+        'sentTime': int(time.time()),
+        'event': 'run',
+        'data': {
+            'caller': {'id': str(index % 50)},
+            'functionName': 'move',
+            'args': {'tile': {'id': str(1000 + index)}},
+        },
+    }) + EOT_CHAR).encode('utf-8')
+
+
+def wait_for_rans(transport, count):
+    while count > 0:
+        for frame in transport.recv_frames():
+            if json.loads(frame)['event'] == 'ran':
+                count -= 1
+
+
+def measure(transport, commands, batch, coalesce):
+    """Sends the commands in batches, waiting for every reply of a batch
+    before the next one, like a pipelined AI step would.
+
+    Returns the seconds each batch took to be fully replied to."""
+    latencies = []
+    for start in range(0, commands, batch):
+        frames = [run_frame(i) for i in range(start, start + batch)]
+        began = time.perf_counter()
+        if coalesce:
+            transport.send(b''.join(frames))
+        else:
+            for frame in frames:
+                transport.send(frame)
+        wait_for_rans(transport, len(frames))
+        latencies.append(time.perf_counter() - began)
+    return latencies
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks sending commands to the server.')
+    parser.add_argument('--commands', type=int, default=2000, help='the number of commands to send per run')
+    parser.add_argument('--batch', type=int, default=10, help='commands sent per step before waiting on their replies')
+    args = parser.parse_args()
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    port = listener.getsockname()[1]
+    threading.Thread(target=reply_server, args=(listener,), daemon=True).start()
+
+    for batch in sorted({1, args.batch}):
+        for name, transport_class, coalesce in (
+                ('old', LegacyTransport, False),
+                ('new', SocketTransport, True)):
+            transport = transport_class()
+            transport.connect('127.0.0.1', port)
+            began = time.perf_counter()
+            latencies = measure(transport, args.commands, batch, coalesce)
+            elapsed = time.perf_counter() - began
+            transport.close()
+
+            print('{} batch={:<3} {:9.0f} commands/s  per step p50 {:7.3f} ms  p99 {:7.3f} ms'.format(
+                name, batch, args.commands / elapsed,
+                percentile(latencies, 0.5) * 1000,
+                percentile(latencies, 0.99) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,12 @@
 # This is where you build your AI for the Stumped game.
 
 from joueur.base_ai import BaseAI
-from math import floor, ceil
+from math import floor
 import random
 import heapq
-from collections import defaultdict
+from games.stumped.distance_field import DistanceFields
+from games.stumped.graph import Graph
+from games.stumped.path_finder import PathFinder
 
 WATER = 'water'
 LAND = 'land'
@@ -16,15 +18,9 @@ FOOD = 'food'
 BRANCHES = 'branches'
 
 def get_adjacent(tile, direction):
-    if direction == NORTH:
-        return tile.tile_north
-    elif direction == SOUTH:
-        return tile.tile_south
-    elif direction == EAST:
-        return tile.tile_east
-    elif direction == WEST:
-        return tile.tile_west
-    else:
+    try:
+        return tile.get_adjacent(direction)
+    except KeyError:
         raise Exception("Unknown direction: " + direction)
 
 def opposite(direction):
@@ -101,8 +97,11 @@ class AI(BaseAI):
         """
         # replace with your start logic
 
-    def game_updated(self):
+    def game_updated(self, changes=None):
         """ This is called every time the game's state updates, so if you are tracking anything you can update it here.
+
+        Args:
+            changes (DeltaChanges): What the update changed: the game objects created, removed and modified, and the fields of each that changed.
         """
         # replace with your game updated logic
 
@@ -126,24 +125,27 @@ class AI(BaseAI):
         Perform spawn action. Prioritizes lodge closest to a branch spawner.
         Tries to keep an even number of Builders and Fighters, ties going to Builders.
         """
-        can_spawn = {lodge for lodge in self.player.lodges if not lodge.beaver and not permablocked(lodge)}
-        enemies = [beaver.tile for beaver in self.player.opponent.beavers]
-        while self.alive_beavers < self.game.free_beavers_count:
-            path = []
-            if self.num_builders > self.num_fighters and enemies:
-                job = self.FIGHTER
-                self.num_fighters += 1
-                path = self.find_path(can_spawn, enemies)
-            if not path:
-                job = self.BUILDER
-                self.num_builders += 1
-                path = self.find_path(can_spawn, self.branch_spawners())
-            if not path:
-                break
-            lodge = path[0]
-            can_spawn.remove(lodge)
-            job.recruit(lodge)
-            self.alive_beavers += 1
+        can_spawn = {lodge for lodge in self.game.lodges_of(self.player) if not lodge.beaver and not permablocked(lodge)}
+        enemies = [beaver.tile for beaver in self.game.beavers_of(self.player.opponent)]
+        # Recruiting doesn't change anything the loop reads, so don't wait
+        # on the server between recruits.
+        with self.pipelined():
+            while self.alive_beavers < self.game.free_beavers_count:
+                path = []
+                if self.num_builders > self.num_fighters and enemies:
+                    job = self.FIGHTER
+                    self.num_fighters += 1
+                    path = self.find_shared_path(can_spawn, enemies)
+                if not path:
+                    job = self.BUILDER
+                    self.num_builders += 1
+                    path = self.find_shared_path(can_spawn, self.branch_spawners())
+                if not path:
+                    break
+                lodge = path[0]
+                can_spawn.remove(lodge)
+                job.recruit(lodge)
+                self.alive_beavers += 1
 
     def enough_to_build(self, beaver, tile):
         return beaver.branches + tile.branches >= self.player.branches_to_build_lodge
@@ -215,23 +217,20 @@ class AI(BaseAI):
             return
         non_lodge_tiles = [tile for tile in beaver.tile.get_neighbors() if pathable(tile)]
         if non_lodge_tiles:
-            path = self.find_path(non_lodge_tiles, self.branch_spawners())
+            path = self.find_shared_path(non_lodge_tiles, self.branch_spawners())
             if path:
                 step = path[0]
                 if move_cost(beaver.tile, step) <= beaver.moves:
                     beaver.move(step)
 
     def branch_spawners(self):
-        return {tile for tile in self.game.tiles
-                if tile.spawner and tile.spawner.health > 1 and tile.spawner.type == BRANCHES}
+        return {spawner.tile for spawner in self.game.spawners_of(BRANCHES, min_health=1)}
 
     def gather_branches(self, beaver):
         """Full turn command that tries to move to the nearest branch spawner and get branches."""
         self.try_attack(beaver)
         self.try_harvest(beaver, BRANCHES)
-        goals = [tile for tile in self.game.tiles
-                 if tile.spawner and tile.spawner.health > 1 and tile.spawner.type == BRANCHES]
-        path = self.find_path([beaver.tile], goals)
+        path = self.find_path([beaver.tile], self.branch_spawners())
         self.attack_move(beaver, path, last_step=False)
         self.try_harvest(beaver, BRANCHES)
 
@@ -241,8 +240,13 @@ class AI(BaseAI):
         If there is a near by pile, move and add to it, otherwise just dump next to you.
         """
         self.try_attack(beaver)
-        goals = [tile for tile in self.closer_to_me
-                 if droppable(tile) and not self.my_lodge(tile) and not self.their_lodge(tile)]
+        arrays = self.game.board_arrays()
+        if arrays is not None:
+            open_tiles = arrays.tiles_where(arrays.droppable() & (arrays.lodge_owner < 0))
+            goals = list(self.closer_to_me.intersection(open_tiles))
+        else:
+            goals = [tile for tile in self.closer_to_me
+                     if droppable(tile) and not self.my_lodge(tile) and not self.their_lodge(tile)]
         path = self.find_path([beaver.tile], goals)
         better = [tile for tile in goals if tile.branches > 0]
         if better:
@@ -266,12 +270,16 @@ class AI(BaseAI):
     def go_hunting(self, beaver):
         """Full turn command to seek out and attack enemy lodges."""
         self.try_attack(beaver)
-        path = self.find_path([beaver.tile], [tile for tile in self.game.tiles if self.their_lodge(tile)])
+        path = self.find_shared_path([beaver.tile], self.game.lodges_of(self.player.opponent))
         if not path:
-            path = self.find_path([beaver.tile], [enemy.tile for enemy in self.player.opponent.beavers
-                                                  if enemy.health > 0 and enemy.turns_distracted == 0])
+            path = self.find_path([beaver.tile], [enemy.tile for enemy in self.game.beavers_of(self.player.opponent, living=True)
+                                                  if enemy.turns_distracted == 0])
         self.attack_move(beaver, path, last_step=False)
 
+    def living_beavers(self):
+        """My beavers with health left, in the order they were recruited."""
+        return sorted(self.game.beavers_of(self.player, living=True))
+
     def setup(self):
         for job in self.game.jobs:
             if job.title == 'Hungry':
@@ -291,9 +299,9 @@ class AI(BaseAI):
             else:
                 raise Exception("Bad job title:" + job.title)
         self.COMBAT = set([self.HUNGRY, self.BASIC, self.HOT_LADY, self.FIGHTER])
-        self.alive_beavers = len([beaver for beaver in self.player.beavers if beaver.health > 0])
-        self.num_fighters = len([beaver for beaver in self.player.beavers if beaver.job is self.FIGHTER])
-        self.num_builders = len([beaver for beaver in self.player.beavers if beaver.job is self.BUILDER])
+        self.alive_beavers = len(self.game.beavers_of(self.player, living=True))
+        self.num_fighters = len([beaver for beaver in self.game.beavers_of(self.player) if beaver.job is self.FIGHTER])
+        self.num_builders = len([beaver for beaver in self.game.beavers_of(self.player) if beaver.job is self.BUILDER])
 
     def run_turn(self):
         """ This is called every time it is this AI.player's turn.
@@ -305,7 +313,8 @@ class AI(BaseAI):
         self.setup()
         self.set_nearest_beaver()
         self.spawn()
-        for beaver in self.player.beavers:
+        # Only the living ones, as dead beavers stay in player.beavers.
+        for beaver in self.living_beavers():
             if not can_act(beaver):
                 continue
             # Always try to build a lodge if you can
@@ -323,7 +332,7 @@ class AI(BaseAI):
                 self.go_hunting(beaver)
             else:
                 self.gather_branches(beaver)
-        for beaver in self.player.beavers:
+        for beaver in self.living_beavers():
             # If you still have moves left, try not to end your turn
             # on a lodge
             self.try_move_off_lodge(beaver)
@@ -332,37 +341,36 @@ class AI(BaseAI):
         print('Done with our turn')
         return True  # to signify that we are truly done with this turn
 
+    def graph(self):
+        """
+        The map as a Graph for searching, with the cost of every move worked
+        out once. Built the first time it is asked for, with the PathFinder
+        and DistanceFields that search it.
+        """
+        graph = getattr(self, '_graph', None)
+        if graph is None or not graph.fits(self.game):
+            graph = self._graph = Graph(self.game, move_cost)
+            self._path_finder = PathFinder(graph)
+            self._distance_fields = DistanceFields(graph)
+        return graph
+
     def find_path(self, start_tiles, goal_tiles):
         """
         Given a list of starting locations and a list of ending locations,
-        find the shortest path between them. Uses a priority queue to
-        do Uniform Cost Search (think Breadth First Search, but with movement
-        cost included).
+        find the shortest path between them. Uses A* over the tiles' indexes,
+        with movement cost included, see PathFinder.
         """
-        open_q = [(0, tile) for tile in start_tiles]
-        heapq.heapify(open_q)
-        goals = {tile for tile in goal_tiles}
-        source = defaultdict(lambda: (None, 100000000))
-        for tile in start_tiles:
-            source[tile] = (tile, 0)
-        while open_q:
-            moves, working = heapq.heappop(open_q)
-            for neighbor in working.get_neighbors():
-                if neighbor in goals:
-                    steps = [neighbor, working]
-                    previous = working
-                    while source[previous][0] != previous:
-                        previous = source[previous][0]
-                        steps.append(previous)
-                    return list(reversed(steps))
-                if not pathable(neighbor):
-                    continue
-                previous_tile, previous_distance = source[neighbor]
-                current_distance = moves + move_cost(working, neighbor)
-                if current_distance < previous_distance:
-                    source[neighbor] = (working, current_distance)
-                    heapq.heappush(open_q, (current_distance, neighbor))
-        return []
+        self.graph()
+        return self._path_finder.find_path(start_tiles, goal_tiles)
+
+    def find_shared_path(self, start_tiles, goal_tiles):
+        """
+        Like find_path, for goals many beavers head for: searches once out
+        from the goals, and keeps that for every path to them until a beaver
+        moves, see DistanceFields. The path costs the same as find_path's.
+        """
+        self.graph()
+        return self._distance_fields.find_path(start_tiles, goal_tiles)
 
     def set_nearest_beaver(self):
         """
@@ -370,27 +378,42 @@ class AI(BaseAI):
         distance-wise closer to my units than theirs. Pretty sure this
         wasn't useful at all.
         """
-        open_q = [(0, beaver.tile, beaver) for beaver in self.game.beavers]
+        graph = self.graph()
+        offsets, targets, costs, ranks = graph.offsets, graph.targets, graph.costs, graph.ranks
+        blocked = self.game.blocked_mask()
+        beavers = self.game.beavers
+        moves = [beaver.job.moves for beaver in beavers]
+        beaver_ranks = [beaver._index for beaver in beavers]
+        # by tile index: which of beavers is closest, in turns, and how far
+        source = [-1] * graph.size
+        distance = [100000000] * graph.size
+        # ties go to the lower Tile, then the lower Beaver, as they did when
+        # the queue held the objects themselves
+        open_q = []
+        for number, beaver in enumerate(beavers):
+            index = graph.index(beaver.tile)
+            open_q.append((0, ranks[index], beaver_ranks[number], index, number))
+            source[index] = number
+            distance[index] = 0
         heapq.heapify(open_q)
-        source = defaultdict(lambda: (None, 100000000))
-        for beaver in self.game.beavers:
-            source[beaver.tile] = (beaver, 0)
         while open_q:
-            moves, working, beaver = heapq.heappop(open_q)
-            for neighbor in working.get_neighbors():
-                previous_beaver, previous_distance = source[neighbor]
-                current_distance = moves + move_cost(working, neighbor)
-                if previous_beaver is None or ceil(current_distance / beaver.job.moves) < ceil(previous_distance / previous_beaver.job.moves):
-                    source[neighbor] = (beaver, current_distance)
-                    if pathable(neighbor):
-                        heapq.heappush(open_q, (current_distance, neighbor, beaver))
+            current_moves, _, _, working, number = heapq.heappop(open_q)
+            beaver_moves = moves[number]
+            for edge in range(offsets[working], offsets[working + 1]):
+                neighbor = targets[edge]
+                current_distance = current_moves + costs[edge]
+                previous = source[neighbor]
+                if previous < 0 or -(-current_distance // beaver_moves) < -(-distance[neighbor] // moves[previous]):
+                    source[neighbor] = number
+                    distance[neighbor] = current_distance
+                    if not blocked[neighbor]:
+                        heapq.heappush(open_q, (current_distance, ranks[neighbor], beaver_ranks[number], neighbor, number))
         self.closer_to_me = set()
         self.closer_to_them = set()
-        for tile in self.game.tiles:
-            beaver, _ = source[tile]
-            if not beaver:
+        for index, tile in enumerate(graph.tiles):
+            if source[index] < 0:
                 continue
-            if beaver.owner == self.player:
+            if beavers[source[index]].owner == self.player:
                 self.closer_to_me.add(tile)
             else:
                 self.closer_to_them.add(tile)
@@ -0,0 +1,144 @@
+# BoardArrays: the map's tiles as flat NumPy arrays, one per field, indexed
+# like Game.tiles by `x + y * map_width`. Kept up to date from what each delta
+# changed, so whole-map questions ("every branch spawner", "every tile a beaver
+# can walk on") are a few array operations instead of a loop over every tile.
+#
+# NumPy is optional: Game.board_arrays() is None when it is not installed.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# the values the string fields are stored as: their index in these, or -1
+TILE_TYPES = ('land', 'water')
+DIRECTIONS = ('North', 'East', 'South', 'West')
+SPAWNER_TYPES = ('branches', 'food')
+
+# the game's fields that, when changed, mean the whole board has to be rebuilt
+_BOARD_FIELDS = {'_tiles', '_map_width', '_map_height', '_players'}
+
+
+class BoardArrays():
+    """The map as arrays. Each is indexed by `x + y * map_width`:
+
+    type (int8): the tile's type, an index into TILE_TYPES
+    flow_direction (int8): the water's flow, an index into DIRECTIONS, or -1
+    branches (int32): branches on the tile
+    food (int32): food on the tile
+    spawner_type (int8): the spawner's type, an index into SPAWNER_TYPES, or -1
+    spawner_health (int32): the spawner's health, 0 if there is none
+    lodge_owner (int8): the owner's index in Game.players, or -1
+    beaver (bool): if a beaver is on the tile
+
+    They mirror the state merged from the server; changes made in a snapshot
+    (Game.set_field) are not reflected.
+    """
+
+    def __init__(self, game):
+        self._game = game
+        self.rebuild()
+
+    def rebuild(self):
+        """Fills every array from the game's tiles."""
+        game = self._game
+        self.width = game.map_width
+        self.height = game.map_height
+        self._players = {player: index for index, player in enumerate(game.players)}
+
+        size = len(game.tiles)
+        self.type = numpy.zeros(size, numpy.int8)
+        self.flow_direction = numpy.full(size, -1, numpy.int8)
+        self.branches = numpy.zeros(size, numpy.int32)
+        self.food = numpy.zeros(size, numpy.int32)
+        self.spawner_type = numpy.full(size, -1, numpy.int8)
+        self.spawner_health = numpy.zeros(size, numpy.int32)
+        self.lodge_owner = numpy.full(size, -1, numpy.int8)
+        self.beaver = numpy.zeros(size, numpy.bool_)
+
+        for index, tile in enumerate(game.tiles):
+            if tile is not None:
+                self._update_tile(index, tile)
+
+    def update(self, changes):
+        """Updates the arrays from what a delta changed.
+
+        Args:
+            changes (DeltaChanges): what the delta changed
+        """
+        if changes.fields(self._game) & _BOARD_FIELDS:
+            self.rebuild()
+            return
+
+        for obj in changes.modified:
+            if obj is self._game:
+                continue
+            if obj.game_object_name == 'Tile':
+                tile = obj
+            elif obj.game_object_name == 'Spawner':
+                tile = obj.tile  # its health or type changed
+            else:
+                continue
+            if tile is not None:
+                self._update_tile(tile.x + tile.y * self.width, tile)
+
+    def _update_tile(self, index, tile):
+        spawner = tile._spawner
+        self.type[index] = _index_of(TILE_TYPES, tile._type)
+        self.flow_direction[index] = _index_of(DIRECTIONS, tile._flow_direction)
+        self.branches[index] = tile._branches
+        self.food[index] = tile._food
+        self.spawner_type[index] = _index_of(SPAWNER_TYPES, spawner._type) if spawner else -1
+        self.spawner_health[index] = spawner._health if spawner else 0
+        self.lodge_owner[index] = self._players.get(tile._lodge_owner, -1)
+        self.beaver[index] = tile._beaver is not None
+
+    def tiles_where(self, mask):
+        """Gets the tiles a mask is True for.
+
+        Args:
+            mask (numpy.ndarray): a bool per tile, e.g. from pathable()
+
+        Returns:
+            list[Tile]: the tiles, in the order of Game.tiles
+        """
+        tiles = self._game.tiles
+        return [tiles[index] for index in numpy.flatnonzero(mask)]
+
+    def pathable(self):
+        """Returns a mask of the tiles beavers can move onto, as Tile.is_pathable()."""
+        return ~self.beaver & (self.spawner_type < 0) & (self.lodge_owner < 0)
+
+    def droppable(self):
+        """Returns a mask of the tiles resources can be dropped on: no spawner and no flowing water."""
+        return (self.spawner_type < 0) & (self.flow_direction < 0)
+
+    def lodges(self, player=None):
+        """Returns a mask of the tiles with a lodge, only player's if one is given."""
+        if player is None:
+            return self.lodge_owner >= 0
+        return self.lodge_owner == self._players.get(player, -2)
+
+    def spawners(self, type=None, min_health=0):
+        """Returns a mask of the tiles with a spawner, only of the given type and with more than min_health if given."""
+        mask = self.spawner_type >= 0
+        if type is not None:
+            mask &= self.spawner_type == _index_of(SPAWNER_TYPES, type)
+        if min_health:
+            mask &= self.spawner_health > min_health
+        return mask
+
+    def permablocked(self):
+        """Returns a mask of the tiles whose every neighbor has a spawner or lodge, which never move."""
+        blocked = ((self.spawner_type >= 0) | (self.lodge_owner >= 0)).reshape(self.height, self.width)
+        # off the map counts as blocked, as it is not a neighbor at all
+        padded = numpy.pad(blocked, 1, constant_values=True)
+        return (padded[:-2, 1:-1] & padded[2:, 1:-1] &
+                padded[1:-1, :-2] & padded[1:-1, 2:]).ravel()
+
+
+def _index_of(values, value):
+    try:
+        return values.index(value)
+    except ValueError:
+        return -1
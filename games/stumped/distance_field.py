@@ -0,0 +1,185 @@
+# DistanceFields: the cost to get next to a set of goals from the tiles on the
+# map's Graph, found by one Dijkstra search out from the goals, so every beaver headed
+# for the same goals (the branch spawners, the enemy lodges or beavers) shares
+# one search instead of each running its own. Fields are cached by their goals
+# and the game's occupancy version, as beavers moving changes where can be
+# walked through.
+import heapq
+from collections import OrderedDict
+
+_INFINITY = float('inf')
+
+
+class DistanceField():
+    """The cost to get next to one of a set of goals from each tile, and the
+    next step there, for the map as it was when the field was made.
+
+    The search out from the goals only goes as far as the tiles asked about
+    so far, and carries on from there when asked about one further out.
+    """
+
+    def __init__(self, fields, goals):
+        """
+        Args:
+            fields (DistanceFields): what the field is made for
+            goals (frozenset[int]): the indexes of the goal tiles
+        """
+        self._graph = graph = fields.graph
+        self.goals = goals
+        self.costs = [_INFINITY] * graph.size  # final once settled
+        self._settled = [False] * graph.size
+
+        # Dijkstra from the tiles next to the goals, along the moves into each tile
+        self._heap = []
+        for goal in goals:
+            for index in graph.neighbors(goal):
+                if self.costs[index] != 0:
+                    self.costs[index] = 0
+                    self._heap.append((0, index))
+        heapq.heapify(self._heap)
+
+    def _settle(self, targets):
+        """Searches until one of the targets (indexes) is settled, the one
+        cheapest to get next to a goal from, unless one already is.
+        Returns:
+            int: that target, or None if no goal can be reached from any
+        """
+        settled, costs = self._settled, self.costs
+        best = None
+        for target in targets:
+            if settled[target] and (best is None or costs[target] < costs[best]):
+                best = target
+        if best is not None:
+            return best  # any not settled yet cost at least as much
+
+        targets = set(targets)
+        if not targets:
+            return None
+        graph, heap = self._graph, self._heap
+        into_offsets, sources, into_costs = graph.into_offsets, graph.sources, graph.into_costs
+        blocked = graph.game.blocked_mask()
+        while heap:
+            cost, current = heapq.heappop(heap)
+            if settled[current]:
+                continue
+            settled[current] = True
+            # only out of tiles that can be walked through, the others just
+            # get the cost of starting from them, as a beaver's own tile does
+            if not blocked[current]:
+                for edge in range(into_offsets[current], into_offsets[current + 1]):
+                    previous = sources[edge]
+                    previous_cost = cost + into_costs[edge]
+                    if previous_cost < costs[previous]:
+                        costs[previous] = previous_cost
+                        heapq.heappush(heap, (previous_cost, previous))
+            if current in targets:
+                return current
+        return None
+
+    def cost(self, tile):
+        """Gets the cost to get next to a goal from a tile.
+        Returns:
+            int: the cost, or infinity if no goal can be reached
+        """
+        index = self._graph.index(tile)
+        return self.costs[index] if self._settle((index,)) is not None else _INFINITY
+
+    def next_step(self, tile):
+        """Gets the next tile on the way to a goal from a tile.
+        Returns:
+            Tile: the next tile, which is the goal if tile is next to one, or None if no goal can be reached
+        """
+        index = self._settle((self._graph.index(tile),))
+        if index is None:
+            return None
+        step = self._next_step(index)
+        return self._graph.tiles[step] if step is not None else None
+
+    def _next_step(self, index):
+        # the neighbors of a settled tile it is cheapest to go through are
+        # settled too, as they cost less and the search goes in order of cost
+        graph, costs = self._graph, self.costs
+        cost = costs[index]
+        if cost == 0:
+            for neighbor in graph.neighbors(index):
+                if neighbor in self.goals:
+                    return neighbor
+        blocked = graph.game.blocked_mask()
+        for edge in range(graph.offsets[index], graph.offsets[index + 1]):
+            neighbor = graph.targets[edge]
+            if costs[neighbor] + graph.costs[edge] == cost and not blocked[neighbor]:
+                return neighbor
+        return None
+
+    def path(self, start_tiles):
+        """Gets the cheapest path from any of the start tiles to a goal,
+        following next_step.
+        Returns:
+            list[Tile]: from a start tile to a goal tile, both included, like AI.find_path, or empty if no goal can be reached
+        """
+        graph = self._graph
+        index = self._settle([graph.index(tile) for tile in start_tiles])
+        if index is None:
+            return []
+        steps = [index]
+        while True:
+            next_to_goal = self.costs[index] == 0
+            index = self._next_step(index)
+            if index is None:
+                return []
+            steps.append(index)
+            if next_to_goal:
+                return [graph.tiles[step] for step in steps]
+
+
+class DistanceFields():
+    """Makes and caches DistanceFields for a game's map, keeping the most
+    recently used ones for the game's current occupancy version."""
+
+    def __init__(self, graph, capacity=8):
+        """
+        Args:
+            graph (Graph): the map the fields are over
+            capacity (int): how many fields to keep
+        """
+        self.graph = graph
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._fields = OrderedDict()  # goals -> DistanceField, least recently used first
+        self._version = graph.game.occupancy_version()
+
+    def field(self, goal_tiles):
+        """Gets the field for a set of goals, from the cache if it is still
+        up to date, otherwise searching.
+        Args:
+            goal_tiles (iterable[Tile]): the tiles to get next to
+        Returns:
+            DistanceField: the field
+        """
+        version = self.graph.game.occupancy_version()
+        if version != self._version:
+            self._fields.clear()  # every field could go through tiles that aren't pathable now
+            self._version = version
+
+        goals = frozenset(self.graph.index(tile) for tile in goal_tiles if tile is not None)
+        field = self._fields.get(goals)
+        if field is not None:
+            self.hits += 1
+            self._fields.move_to_end(goals)
+            return field
+
+        self.misses += 1
+        field = self._fields[goals] = DistanceField(self, goals)
+        if len(self._fields) > self.capacity:
+            self._fields.popitem(last=False)
+        return field
+
+    def find_path(self, start_tiles, goal_tiles):
+        """Finds a cheapest path from any of the start tiles to next to any of
+        the goal tiles, like AI.find_path. It costs the same as the one
+        find_path finds, but may be another when there are ties.
+        Returns:
+            list[Tile]: from a start tile to a goal tile, both included, or empty if no goal can be reached
+        """
+        return self.field(goal_tiles).path(start_tiles)
@@ -5,6 +5,8 @@
 # Instead, you should only be reading its variables and calling its functions.
 
 from joueur.base_game import BaseGame
+from games.stumped.board_arrays import BoardArrays, numpy
+from games.stumped.game_indexes import GameIndexes
 
 # import game objects
 from games.stumped.beaver import Beaver
@@ -14,6 +16,7 @@ from games.stumped.player import Player
 from games.stumped.spawner import Spawner
 from games.stumped.tile import Tile
 
+_EMPTY = frozenset()
 
 
 class Game(BaseGame):
@@ -46,6 +49,9 @@ class Game(BaseGame):
         self._tiles = []
 
         self.name = "Stumped"
+        self._board_arrays = None
+        self._indexes = GameIndexes(self)
+        self._occupancy_version = 0
 
         self._game_object_classes = {
             'Beaver': Beaver,
@@ -205,4 +211,78 @@ class Game(BaseGame):
             # out of bounds
             return None
 
-        return self.tiles[x + y * self.mapWidth]
+        return self.tiles[x + y * self.map_width]
+
+    def spawners_of(self, type, min_health=0):
+        """Gets the Spawners of a type, kept indexed as deltas are merged
+        Args:
+            type (str): "branches" or "food"
+            min_health (int): only get those with more health than this
+        Returns:
+            list[Spawner]: the Spawners
+        """
+        spawners = self._indexes.spawners.get(type, ())
+        return [spawner for spawner in spawners if spawner._health > min_health]
+
+    def lodges_of(self, player):
+        """Gets the Tiles with a Player's lodges, kept indexed as deltas are merged
+        Args:
+            player (Player): the owner
+        Returns:
+            set[Tile]: the Tiles, which should not be modified
+        """
+        return self._indexes.lodges.get(player, _EMPTY)
+
+    def beavers_of(self, player, living=False):
+        """Gets a Player's Beavers, kept indexed as deltas are merged
+        Args:
+            player (Player): the owner
+            living (bool): only get those with health left
+        Returns:
+            set[Beaver]: the Beavers, which should not be modified
+        """
+        beavers = self._indexes.living_beavers if living else self._indexes.beavers
+        return beavers.get(player, _EMPTY)
+
+    def occupied_tiles(self):
+        """Gets the Tiles with a Beaver on them, kept indexed as deltas are merged
+        Returns:
+            set[Tile]: the Tiles, which should not be modified
+        """
+        return self._indexes.occupied
+
+    def blocked_mask(self):
+        """Gets which Tiles can't be walked through, as they have a Beaver, Spawner or lodge on them, kept up to date as deltas are merged
+        Returns:
+            bytearray: 1 for each blocked Tile and 0 for the others, by their index x + y * map_width, which should not be modified
+        """
+        return self._indexes.blocked
+
+    def board_arrays(self):
+        """Gets the map as NumPy arrays, kept up to date as deltas are merged. Built the first time it is asked for.
+        Returns:
+            BoardArrays: the arrays, or None if NumPy is not installed
+        """
+        if self._board_arrays is None and numpy is not None:
+            self._board_arrays = BoardArrays(self)
+        return self._board_arrays
+
+    def occupancy_version(self):
+        """Gets a number that goes up whenever a delta changes which Tiles are pathable: a Beaver moving, a Spawner or lodge appearing or going
+        Returns:
+            int: the version, to tell if something worked out from the Tiles' occupants is out of date
+        """
+        return self._occupancy_version
+
+    def _delta_merged(self, changes):
+        occupancy_changed = bool(changes.created or changes.removed)
+        for obj, fields in changes.modified.items():
+            if not fields.isdisjoint(Tile._links):
+                obj._unlink()  # its neighbors are rebuilt when next asked for
+            if not occupancy_changed and not fields.isdisjoint(Tile._blockers):
+                occupancy_changed = obj.game_object_name == 'Tile'
+        if occupancy_changed:
+            self._occupancy_version += 1
+        self._indexes.update(changes)
+        if self._board_arrays is not None:
+            self._board_arrays.update(changes)
@@ -0,0 +1,89 @@
+# GameIndexes: the game objects the AI looks up by what they are rather than
+# where they are (spawners by type, lodges and beavers by owner, occupied and
+# blocked tiles), kept up to date from what each delta changed so finding them
+# is a lookup instead of a scan of the map.
+
+# the game's fields that, when changed, mean every index has to be rebuilt
+_GAME_FIELDS = {'_tiles', '_players', '_map_width'}
+
+
+class GameIndexes():
+    """Indexes of a game's objects, see the Game methods that read them:
+    spawners_of, lodges_of, beavers_of, occupied_tiles and blocked_mask.
+
+    Like BoardArrays they mirror the state merged from the server; changes
+    made in a snapshot (Game.set_field) are not reflected.
+    """
+
+    def __init__(self, game):
+        self._game = game
+        self.rebuild()
+
+    def rebuild(self):
+        """Indexes every game object in the game from scratch."""
+        self.spawners = {}  # spawner type -> set of Spawners
+        self.lodges = {}  # Player -> set of Tiles with their lodges
+        self.beavers = {}  # Player -> set of their Beavers
+        self.living_beavers = {}  # Player -> set of their Beavers with health left
+        self.occupied = set()  # Tiles with a Beaver on them
+        # by each Tile's index (x + y * map_width), 1 if it isn't pathable
+        self.blocked = bytearray(len(self._game._tiles))
+
+        # what each object is indexed under now, to take it out when that changes
+        self._keys = {name: {} for name in ('spawners', 'lodges', 'beavers', 'living_beavers')}
+
+        for obj in self._game.game_objects.values():
+            self._reindex(obj)
+
+    def update(self, changes):
+        """Updates the indexes from what a delta changed.
+
+        Args:
+            changes (DeltaChanges): what the delta changed
+        """
+        if changes.fields(self._game) & _GAME_FIELDS:
+            self.rebuild()
+            return
+
+        for obj in changes.removed:
+            self._forget(obj)
+        removed = changes.removed
+        for obj in changes.modified:
+            if obj is not self._game and not (removed and obj in removed):
+                self._reindex(obj)
+
+    def _reindex(self, obj):
+        name = obj.game_object_name
+        if name == 'Tile':
+            self._move('lodges', obj, obj._lodge_owner)
+            if obj._beaver is not None:
+                self.occupied.add(obj)
+            else:
+                self.occupied.discard(obj)
+            index = obj._x + obj._y * self._game._map_width
+            if index < len(self.blocked):
+                self.blocked[index] = not obj.is_pathable()
+        elif name == 'Spawner':
+            self._move('spawners', obj, obj._type)
+        elif name == 'Beaver':
+            self._move('beavers', obj, obj._owner)
+            self._move('living_beavers', obj, obj._owner if obj._health > 0 else None)
+
+    def _forget(self, obj):
+        for index in self._keys:
+            self._move(index, obj, None)
+        self.occupied.discard(obj)
+
+    def _move(self, index, obj, key):
+        """Indexes obj under key in the named index, taking it out of where it was."""
+        keys = self._keys[index]
+        previous = keys.pop(obj, None)
+        if previous == key and previous is not None:
+            keys[obj] = key
+            return
+        sets = getattr(self, index)
+        if previous is not None:
+            sets[previous].discard(obj)
+        if key:
+            sets.setdefault(key, set()).add(obj)
+            keys[obj] = key
@@ -0,0 +1,66 @@
+# Graph: the map as a graph for the AI's searches, built once the initial
+# state is merged. Terrain and flow never change during a game, so neither do
+# the moves between tiles or what they cost; only which tiles are blocked
+# does, and that comes from the game's occupancy mask (Game.blocked_mask()).
+#
+# Tiles are numbered by index, x + y * map_width, and the moves are kept in
+# compressed sparse row (CSR) lists: the moves out of tile i are to
+# targets[offsets[i]:offsets[i + 1]], in North, East, South, West order, each
+# costing the matching entry of costs.
+
+
+class Graph():
+    """The moves between a game's tiles and what each costs, as CSR lists,
+    both out of each tile and, for searching back from goals, into it."""
+
+    def __init__(self, game, move_cost):
+        """
+        Args:
+            game (Game): the game whose map this is
+            move_cost (function): the cost to move from a Tile to its neighbor
+        """
+        tiles = game.tiles
+        self.game = game
+        self.width = game.map_width
+        self.tiles = list(tiles)
+        self.size = len(tiles)
+        # each tile's place in Tile's order (see BaseGameObject.__lt__), for
+        # searches to break ties as a heap of Tiles would
+        self.ranks = [tile._index for tile in tiles]
+
+        # the moves out of each tile
+        self.offsets = [0]
+        self.targets = []
+        self.costs = []
+        for tile in tiles:
+            for neighbor in tile.get_neighbors():
+                self.targets.append(self.index(neighbor))
+                self.costs.append(move_cost(tile, neighbor))
+            self.offsets.append(len(self.targets))
+
+        # the same moves by the tile moved into: the moves into tile i are
+        # from sources[into_offsets[i]:into_offsets[i + 1]], costing into_costs
+        into = [[] for _ in tiles]
+        for index in range(self.size):
+            for edge in range(self.offsets[index], self.offsets[index + 1]):
+                into[self.targets[edge]].append((index, self.costs[edge]))
+        self.into_offsets = [0]
+        self.sources = []
+        self.into_costs = []
+        for moves in into:
+            for source, cost in moves:
+                self.sources.append(source)
+                self.into_costs.append(cost)
+            self.into_offsets.append(len(self.sources))
+
+    def fits(self, game):
+        """Checks if this was made for game's map as it is now."""
+        return game is self.game and len(game.tiles) == self.size
+
+    def index(self, tile):
+        """Gets a tile's index in the graph, x + y * map_width."""
+        return tile.x + tile.y * self.width
+
+    def neighbors(self, index):
+        """Gets the indexes of the tiles next to a tile, in North, East, South, West order."""
+        return self.targets[self.offsets[index]:self.offsets[index + 1]]
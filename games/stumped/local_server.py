@@ -0,0 +1,829 @@
+# LocalServer: a stand-in Stumped game server, for playing and load testing
+# this client without network access.
+#
+# It speaks the same EOT delimited JSON protocol as the real game server and
+# applies enough of the Stumped rules for games/stumped/ai.py to play full
+# games against itself. It is not the official rules engine, so don't tune
+# an AI against it, use it to measure the client.
+#
+# Run from the root of the client, then point two clients at it:
+#     python3 -m games.stumped.local_server --port 3000 --width 32 --height 20
+#     ./run Stumped -s localhost:3000 -r test &
+#     ./run Stumped -s localhost:3000 -r test
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from joueur.codec import get_codec
+from joueur.frame_decoder import FrameDecoder
+
+EOT_BYTE = b'\x04'
+DELTA_REMOVED = '&RM'
+DELTA_LIST_LENGTH = '&LEN'
+
+NORTH = 'North'
+EAST = 'East'
+SOUTH = 'South'
+WEST = 'West'
+WATER = 'water'
+LAND = 'land'
+
+JOBS = [
+    # title, moves, actions, health, damage, distractionPower, carryLimit, chopping, munching, cost
+    ('Basic', 3, 1, 6, 2, 1, 4, 1, 1, 4),
+    ('Fighter', 3, 1, 8, 3, 1, 2, 1, 1, 6),
+    ('Bulky', 2, 1, 12, 1, 0, 8, 1, 1, 6),
+    ('Hungry', 3, 1, 6, 2, 1, 3, 1, 3, 5),
+    ('Swift', 5, 1, 4, 1, 0, 3, 1, 1, 5),
+    ('Builder', 3, 2, 6, 1, 0, 6, 2, 1, 6),
+    ('Hot Lady', 3, 1, 6, 0, 3, 3, 1, 1, 8),
+]
+
+SPAWNER_MAX_HEALTH = 5
+STARTING_LODGE_COST = 8
+
+
+# raised when a client sends a command the rules don't allow
+class InvalidCommand(Exception):
+    pass
+
+
+class _GameObject():
+    """A game object as the server sees it. Public attributes are the fields
+    sent to clients, named as on the wire."""
+
+    def __init__(self, game, game_object_name, **fields):
+        self.id = str(len(game.game_objects))
+        self.gameObjectName = game_object_name
+        self.logs = []
+        self.__dict__.update(fields)
+        game.game_objects[self.id] = self
+        game.changed(self)
+
+    def serialize(self):
+        return {key: _serialize(value) for key, value in self.__dict__.items()
+                if not key.startswith('_')}
+
+
+def _serialize(value):
+    if isinstance(value, _GameObject):
+        return {'id': value.id}
+    if isinstance(value, list):
+        return [_serialize(item) for item in value]
+    return value
+
+
+def _list_delta(previous, current):
+    delta = {DELTA_LIST_LENGTH: len(current)}
+    for i, item in enumerate(current):
+        if i >= len(previous) or previous[i] != item:
+            delta[str(i)] = item
+    return delta
+
+
+def _fields_delta(previous, current):
+    delta = {}
+    for key, value in current.items():
+        if key in previous and (previous[key] is value or previous[key] == value):
+            continue
+        if isinstance(value, list):
+            delta[key] = _list_delta(previous.get(key, []), value)
+        else:
+            delta[key] = value
+    return delta
+
+
+class StumpedGame():
+    """The state and rules of one game of Stumped between two players."""
+
+    def __init__(self, session, player_names, width=32, height=20,
+                 max_turns=500, lodges_to_win=10, seed=None):
+        self.session = session
+        self.random = random.Random(seed)
+        self.game_objects = {}
+        self._dirty = []
+        self._dirty_ids = set()
+        self._sent = {}  # the last serialized version clients have of each object
+        self._sent_game = {}
+        self.over = False
+
+        self.map_width = width
+        self.map_height = height
+        self.max_turns = max_turns
+        self.lodges_to_win = lodges_to_win
+        self.free_beavers_count = 10
+        self.lodge_cost_constant = 1.2
+        self.spawner_harvest_constant = 1.0
+        self.current_turn = 0
+
+        self.players = [
+            _GameObject(self, 'Player', beavers=[], branchesToBuildLodge=STARTING_LODGE_COST,
+                        clientType='Python', lodges=[], lost=False, name=name, opponent=None,
+                        reasonLost='', reasonWon='', timeRemaining=1e10, won=False)
+            for name in player_names
+        ]
+        self.players[0].opponent = self.players[1]
+        self.players[1].opponent = self.players[0]
+        self.current_player = self.players[0]
+
+        self.tiles = self._generate_map()
+        self.jobs = [
+            _GameObject(self, 'Job', title=title, moves=moves, actions=actions,
+                        health=health, damage=damage, distractionPower=distraction,
+                        carryLimit=carry, chopping=chopping, munching=munching, cost=cost)
+            for (title, moves, actions, health, damage, distraction, carry,
+                 chopping, munching, cost) in JOBS
+        ]
+        self.spawners = self._place_spawners()
+        self.beavers = []
+
+        for player, x in ((self.players[0], 2), (self.players[1], width - 3)):
+            lodge = self.tile_at(x, height // 2)
+            lodge.type = LAND
+            lodge.flowDirection = ''
+            lodge.lodgeOwner = player
+            player.lodges.append(lodge)
+
+        self._start_turn(self.current_player)
+
+    # -- map ------------------------------------------------------------------
+
+    def tile_at(self, x, y):
+        if 0 <= x < self.map_width and 0 <= y < self.map_height:
+            return self.tiles[x + y * self.map_width]
+
+    def _generate_map(self):
+        width, height = self.map_width, self.map_height
+        tiles = [
+            _GameObject(self, 'Tile', x=x, y=y, type=LAND, flowDirection='',
+                        branches=0, food=0, beaver=None, lodgeOwner=None, spawner=None,
+                        tileNorth=None, tileEast=None, tileSouth=None, tileWest=None)
+            for y in range(height) for x in range(width)
+        ]
+        for tile in tiles:
+            x, y = tile.x, tile.y
+            tile.tileNorth = tiles[x + (y - 1) * width] if y > 0 else None
+            tile.tileEast = tiles[x + 1 + y * width] if x + 1 < width else None
+            tile.tileSouth = tiles[x + (y + 1) * width] if y + 1 < height else None
+            tile.tileWest = tiles[x - 1 + y * width] if x > 0 else None
+
+        def water(x, y, direction):
+            for tile in (tiles[x + y * width], tiles[width - 1 - x + y * width]):
+                tile.type = WATER
+                mirrored = tile.x != x
+                tile.flowDirection = {EAST: WEST, WEST: EAST}.get(direction, direction) \
+                    if mirrored else direction
+
+        # a river down the middle, fed by streams from both halves
+        for y in range(height):
+            water((width - 1) // 2, y, SOUTH)
+        for _ in range(max(1, height // 8)):
+            y = self.random.randrange(height)
+            start = self.random.randrange(max(1, width // 4))
+            for x in range(start, (width - 1) // 2):
+                water(x, y, EAST)
+        return tiles
+
+    def _place_spawners(self):
+        spawners = []
+        half = self.map_width // 2
+        count = max(2, self.map_width * self.map_height // 40)
+        candidates = [tile for tile in self.tiles if tile.x < half - 1 and
+                      tile.type == LAND and 1 < abs(tile.x - 2) + abs(tile.y - self.map_height // 2)]
+        for tile in self.random.sample(candidates, min(count, len(candidates))):
+            kind = 'branches' if self.random.random() < 0.65 else 'food'
+            mirror = self.tile_at(self.map_width - 1 - tile.x, tile.y)
+            for spot in (tile, mirror):
+                spawner = _GameObject(self, 'Spawner', hasBeenHarvested=False,
+                                      health=3, tile=spot, type=kind)
+                spot.spawner = spawner
+                self.changed(spot)
+                spawners.append(spawner)
+        return spawners
+
+    # -- deltas ---------------------------------------------------------------
+
+    def changed(self, obj):
+        if obj.id not in self._dirty_ids:
+            self._dirty_ids.add(obj.id)
+            self._dirty.append(obj)
+
+    def _game_fields(self):
+        return {
+            'beavers': _serialize(self.beavers),
+            'currentPlayer': _serialize(self.current_player),
+            'currentTurn': self.current_turn,
+            'freeBeaversCount': self.free_beavers_count,
+            'jobs': _serialize(self.jobs),
+            'lodgeCostConstant': self.lodge_cost_constant,
+            'lodgesToWin': self.lodges_to_win,
+            'mapHeight': self.map_height,
+            'mapWidth': self.map_width,
+            'maxTurns': self.max_turns,
+            'players': _serialize(self.players),
+            'session': self.session,
+            'spawner': _serialize(self.spawners),
+            'spawnerHarvestConstant': self.spawner_harvest_constant,
+            'spawnerTypes': ['food', 'branches'],
+            # tiles never change after the initial state, only send them once
+            'tiles': _serialize(self.tiles) if not self._sent_game else self._sent_game['tiles'],
+        }
+
+    def pop_delta(self):
+        """Gets everything that changed since the last delta, or None."""
+        delta = {}
+        if self._dirty:
+            objects = {}
+            for obj in self._dirty:
+                current = obj.serialize()
+                objects[obj.id] = _fields_delta(self._sent.get(obj.id, {}), current)
+                self._sent[obj.id] = current
+            delta['gameObjects'] = objects
+            self._dirty = []
+            self._dirty_ids = set()
+
+        fields = self._game_fields()
+        delta.update(_fields_delta(self._sent_game, fields))
+        self._sent_game = fields
+        return delta or None
+
+    # -- turns ----------------------------------------------------------------
+
+    def _start_turn(self, player):
+        for beaver in player.beavers:
+            if beaver.health <= 0:
+                continue
+            beaver.recruited = True
+            if beaver.turnsDistracted > 0:
+                beaver.turnsDistracted -= 1
+                beaver.moves = 0
+                beaver.actions = 0
+            else:
+                beaver.moves = beaver.job.moves
+                beaver.actions = beaver.job.actions
+            self.changed(beaver)
+
+    def end_turn(self):
+        """Ends the current player's turn and starts the next one's."""
+        self._flow_resources()
+
+        for spawner in self.spawners:
+            if not spawner.hasBeenHarvested and spawner.health < SPAWNER_MAX_HEALTH:
+                spawner.health += 1
+                self.changed(spawner)
+            elif spawner.hasBeenHarvested:
+                spawner.hasBeenHarvested = False
+                self.changed(spawner)
+
+        # dead beavers stay in their owner's list, but leave the game's
+        self.beavers = [beaver for beaver in self.beavers if beaver.health > 0]
+
+        self.current_turn += 1
+        self.current_player = self.current_player.opponent
+        self._start_turn(self.current_player)
+        self._check_winner()
+
+    def _flow_resources(self):
+        moving = []
+        for tile in self.tiles:
+            if tile.type == WATER and (tile.branches or tile.food):
+                downstream = getattr(tile, 'tile' + tile.flowDirection)
+                if downstream and not downstream.spawner:
+                    moving.append((tile, downstream, tile.branches, tile.food))
+        for tile, downstream, branches, food in moving:
+            tile.branches -= branches
+            tile.food -= food
+            downstream.branches += branches
+            downstream.food += food
+            self.changed(tile)
+            self.changed(downstream)
+
+    def _check_winner(self):
+        for player in self.players:
+            if len(player.lodges) >= self.lodges_to_win:
+                return self._end(player, 'Built {} lodges'.format(self.lodges_to_win),
+                                 'Opponent built {} lodges'.format(self.lodges_to_win))
+
+        for player in self.players:
+            alive = any(beaver.health > 0 for beaver in player.beavers)
+            if not player.lodges and not alive:
+                return self._end(player.opponent, 'Opponent has no lodges or beavers left',
+                                 'No lodges or beavers left')
+
+        if self.current_turn >= self.max_turns:
+            first, second = self.players
+
+            def score(player):
+                return (len(player.lodges), sum(tile.branches for tile in player.lodges))
+            winner = first if score(first) >= score(second) else second
+            self._end(winner, 'Had the most lodges after {} turns'.format(self.max_turns),
+                      'Had the fewest lodges after {} turns'.format(self.max_turns))
+
+    def _end(self, winner, reason_won, reason_lost):
+        self.over = True
+        winner.won = True
+        winner.reasonWon = reason_won
+        winner.opponent.lost = True
+        winner.opponent.reasonLost = reason_lost
+        self.changed(winner)
+        self.changed(winner.opponent)
+
+    # -- commands -------------------------------------------------------------
+
+    def run(self, player, caller, function_name, args):
+        """Runs a command from the player, returning the serialized value it
+        returns. Raises InvalidCommand if the rules don't allow it."""
+        if self.over:
+            raise InvalidCommand('The game is over.')
+        if player is not self.current_player:
+            raise InvalidCommand('It is not your turn.')
+
+        command = self._commands.get(function_name)
+        if not command or caller is None or \
+                command[0] not in (None, caller.gameObjectName):
+            raise InvalidCommand('{} cannot {}.'.format(caller, function_name))
+
+        if caller.gameObjectName == 'Beaver':
+            if caller.owner is not player:
+                raise InvalidCommand('Beaver #{} is not yours.'.format(caller.id))
+            if caller.health <= 0:
+                raise InvalidCommand('Beaver #{} is dead.'.format(caller.id))
+            if not caller.recruited:
+                raise InvalidCommand('Beaver #{} is still being recruited.'.format(caller.id))
+
+        returned = command[1](self, player, caller, **args)
+        if not self.over:
+            self._check_winner()
+        return _serialize(returned)
+
+    def _object(self, reference, game_object_name):
+        obj = self.game_objects.get(reference['id']) if isinstance(reference, dict) else None
+        if obj is None or obj.gameObjectName != game_object_name:
+            raise InvalidCommand('{} is not a {}.'.format(reference, game_object_name))
+        return obj
+
+    @staticmethod
+    def _adjacent(a, b):
+        return abs(a.x - b.x) + abs(a.y - b.y) == 1
+
+    @staticmethod
+    def _move_cost(start, end):
+        if start.type == WATER:
+            if getattr(start, 'tile' + start.flowDirection) is end:
+                return 1
+            if end.type == WATER and getattr(end, 'tile' + end.flowDirection) is start:
+                return 3
+        return 2
+
+    @staticmethod
+    def _load(beaver):
+        return beaver.branches + beaver.food
+
+    @staticmethod
+    def _resource(resource):
+        if resource in ('branch', 'branches'):
+            return 'branches'
+        if resource == 'food':
+            return 'food'
+        raise InvalidCommand('Unknown resource "{}".'.format(resource))
+
+    def _move(self, player, beaver, tile=None):
+        tile = self._object(tile, 'Tile')
+        if not self._adjacent(beaver.tile, tile):
+            raise InvalidCommand('Tile #{} is not adjacent.'.format(tile.id))
+        if tile.beaver or tile.spawner or tile.lodgeOwner:
+            raise InvalidCommand('Tile #{} is blocked.'.format(tile.id))
+        cost = self._move_cost(beaver.tile, tile)
+        if beaver.moves < cost:
+            raise InvalidCommand('Beaver #{} needs {} moves.'.format(beaver.id, cost))
+
+        beaver.moves -= cost
+        beaver.tile.beaver = None
+        self.changed(beaver.tile)
+        beaver.tile = tile
+        tile.beaver = beaver
+        self.changed(tile)
+        self.changed(beaver)
+        return True
+
+    def _attack(self, player, attacker, beaver=None):
+        target = self._object(beaver, 'Beaver')
+        beaver = attacker
+        if beaver.actions <= 0:
+            raise InvalidCommand('Beaver #{} has no actions left.'.format(beaver.id))
+        if target.owner is player or target.health <= 0 or not target.tile:
+            raise InvalidCommand('Beaver #{} cannot be attacked.'.format(target.id))
+        if not self._adjacent(beaver.tile, target.tile):
+            raise InvalidCommand('Beaver #{} is not adjacent.'.format(target.id))
+
+        beaver.actions -= 1
+        self.changed(beaver)
+        target.health = max(0, target.health - beaver.job.damage)
+        target.turnsDistracted = max(target.turnsDistracted, beaver.job.distractionPower)
+        if target.health == 0:
+            tile = target.tile
+            tile.branches += target.branches
+            tile.food += target.food
+            tile.beaver = None
+            self.changed(tile)
+            target.branches = target.food = 0
+            target.tile = None
+        self.changed(target)
+        return True
+
+    def _harvest(self, player, beaver, spawner=None):
+        spawner = self._object(spawner, 'Spawner')
+        if beaver.actions <= 0:
+            raise InvalidCommand('Beaver #{} has no actions left.'.format(beaver.id))
+        if not self._adjacent(beaver.tile, spawner.tile):
+            raise InvalidCommand('Spawner #{} is not adjacent.'.format(spawner.id))
+        room = beaver.job.carryLimit - self._load(beaver)
+        if room <= 0 or spawner.health <= 0:
+            raise InvalidCommand('Nothing to harvest.')
+
+        scalar = beaver.job.chopping if spawner.type == 'branches' else beaver.job.munching
+        gained = min(room, max(1, int(scalar * spawner.health * self.spawner_harvest_constant)))
+        setattr(beaver, spawner.type, getattr(beaver, spawner.type) + gained)
+        beaver.actions -= 1
+        spawner.health -= 1
+        spawner.hasBeenHarvested = True
+        self.changed(beaver)
+        self.changed(spawner)
+        return True
+
+    def _drop(self, player, beaver, tile=None, resource='branches', amount=0):
+        tile = self._object(tile, 'Tile')
+        resource = self._resource(resource)
+        if tile is not beaver.tile and not self._adjacent(beaver.tile, tile):
+            raise InvalidCommand('Tile #{} is too far away.'.format(tile.id))
+        if tile.spawner:
+            raise InvalidCommand('Cannot drop onto a spawner.')
+        held = getattr(beaver, resource)
+        amount = held if amount <= 0 else min(amount, held)
+        if amount <= 0:
+            raise InvalidCommand('Beaver #{} has no {}.'.format(beaver.id, resource))
+
+        setattr(beaver, resource, held - amount)
+        setattr(tile, resource, getattr(tile, resource) + amount)
+        self.changed(beaver)
+        self.changed(tile)
+        return True
+
+    def _pickup(self, player, beaver, tile=None, resource='branches', amount=0):
+        tile = self._object(tile, 'Tile')
+        resource = self._resource(resource)
+        if tile is not beaver.tile and not self._adjacent(beaver.tile, tile):
+            raise InvalidCommand('Tile #{} is too far away.'.format(tile.id))
+        if beaver.actions <= 0:
+            raise InvalidCommand('Beaver #{} has no actions left.'.format(beaver.id))
+        available = getattr(tile, resource)
+        room = beaver.job.carryLimit - self._load(beaver)
+        amount = min(available if amount <= 0 else amount, available, room)
+        if amount <= 0:
+            raise InvalidCommand('Nothing to pick up.')
+
+        setattr(tile, resource, available - amount)
+        setattr(beaver, resource, getattr(beaver, resource) + amount)
+        beaver.actions -= 1
+        self.changed(beaver)
+        self.changed(tile)
+        return True
+
+    def _build_lodge(self, player, beaver):
+        tile = beaver.tile
+        if beaver.actions <= 0:
+            raise InvalidCommand('Beaver #{} has no actions left.'.format(beaver.id))
+        if tile.lodgeOwner or tile.spawner:
+            raise InvalidCommand('Cannot build a lodge on Tile #{}.'.format(tile.id))
+        needed = player.branchesToBuildLodge
+        if beaver.branches + tile.branches < needed:
+            raise InvalidCommand('Need {} branches to build a lodge.'.format(needed))
+
+        from_tile = min(tile.branches, needed)
+        tile.branches -= from_tile
+        beaver.branches -= needed - from_tile
+        beaver.actions -= 1
+        tile.lodgeOwner = player
+        player.lodges.append(tile)
+        player.branchesToBuildLodge = int(math.ceil(
+            STARTING_LODGE_COST * self.lodge_cost_constant ** len(player.lodges)))
+        self.changed(beaver)
+        self.changed(tile)
+        self.changed(player)
+        return True
+
+    def _recruit(self, player, job, tile=None):
+        tile = self._object(tile, 'Tile')
+        if tile.lodgeOwner is not player:
+            raise InvalidCommand('Tile #{} is not your lodge.'.format(tile.id))
+        if tile.beaver:
+            raise InvalidCommand('Tile #{} is occupied.'.format(tile.id))
+        alive = sum(1 for beaver in player.beavers if beaver.health > 0)
+        if alive >= self.free_beavers_count:
+            if tile.food < job.cost:
+                raise InvalidCommand('Need {} food to recruit a {}.'.format(job.cost, job.title))
+            tile.food -= job.cost
+
+        beaver = _GameObject(self, 'Beaver', actions=0, branches=0, food=0,
+                             health=job.health, job=job, moves=0, owner=player,
+                             recruited=False, tile=tile, turnsDistracted=0)
+        tile.beaver = beaver
+        self.beavers.append(beaver)
+        player.beavers.append(beaver)
+        self.changed(tile)
+        self.changed(player)
+        return beaver
+
+    def _log(self, player, game_object, message=''):
+        game_object.logs.append(str(message))
+        self.changed(game_object)
+        return None
+
+    _commands = {
+        'move': ('Beaver', _move),
+        'attack': ('Beaver', _attack),
+        'harvest': ('Beaver', _harvest),
+        'drop': ('Beaver', _drop),
+        'pickup': ('Beaver', _pickup),
+        'buildLodge': ('Beaver', _build_lodge),
+        'recruit': ('Job', _recruit),
+        'log': (None, _log),  # any game object can log
+    }
+
+
+class _Connection():
+    """One client, with its frames to send delayed by the injected latency."""
+
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.name = 'Anonymous'
+        self.session = None
+        self.player = None
+        self._outgoing = asyncio.Queue()
+        self._writer_task = asyncio.ensure_future(self._write())
+
+    def send(self, event, data):
+        frame = self.server.codec.dumps({
+            'sentTime': int(time.time()),
+            'event': event,
+            'data': data,
+        }) + EOT_BYTE
+        self._outgoing.put_nowait((time.monotonic() + self.server.latency, frame))
+
+    async def _write(self):
+        while True:
+            due, frame = await self._outgoing.get()
+            if frame is None:
+                break
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.writer.write(frame)
+            if self._outgoing.empty():
+                await self.writer.drain()
+
+    async def close(self):
+        self._outgoing.put_nowait((0, None))
+        try:
+            await self._writer_task
+        except ConnectionError:
+            pass  # the client hung up first, it has what it needed
+        self.writer.close()
+
+
+class _Session():
+    def __init__(self, name):
+        self.name = name
+        self.connections = []
+        self.game = None
+        self.order_index = 0
+        self.started = None
+        self.commands = 0
+
+
+class LocalServer():
+    """Hosts games of Stumped for clients on this machine.
+
+    Args:
+        width (int): tiles along the x axis of each map
+        height (int): tiles along the y axis of each map
+        latency (float): seconds to delay every frame the server sends by
+        max_turns (int): turns before a game ends on lodge count
+        games (int): stop after this many games have ended, 0 to never stop
+        seed (int): seed for the maps, None for random ones
+    """
+
+    def __init__(self, width=32, height=20, latency=0.0, max_turns=500,
+                 games=0, seed=None):
+        self.width = width
+        self.height = height
+        self.latency = latency
+        self.max_turns = max_turns
+        self.games = games
+        self.seed = seed
+        self.codec = get_codec()
+        self.sessions = {}
+        self.finished = []  # (session name, turns, seconds, commands)
+        self._session_count = 0
+        self._handlers = set()  # the task handling each connected client
+        self._done = None
+
+    async def serve(self, host='localhost', port=3000):
+        self._done = asyncio.get_event_loop().create_future()
+        server = await asyncio.start_server(self._handle, host, port)
+        print('Local Stumped server listening on {}:{}'.format(host, port))
+        try:
+            await self._done
+        finally:
+            server.close()
+            # lets every connection send what it still has queued, e.g. 'over'
+            for handler in list(self._handlers):
+                handler.cancel()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    async def _handle(self, reader, writer):
+        connection = _Connection(self, reader, writer)
+        decoder = FrameDecoder()
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        try:
+            while True:
+                received = await reader.read(decoder.recv_size)
+                if not received:
+                    break
+                for frame in decoder.feed(received):
+                    parsed = self.codec.loads(frame)
+                    await self._on_event(connection, parsed['event'], parsed.get('data'))
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            session = connection.session
+            if session and not session.game:
+                # left the lobby before the game started
+                session.connections.remove(connection)
+                if not session.connections:
+                    self.sessions.pop(session.name, None)
+            elif session and not session.game.over:
+                # the other player wins by default
+                game = session.game
+                game._end(connection.player.opponent, 'Opponent disconnected', 'Disconnected')
+                await self._end_session(session)
+            await connection.close()
+            self._handlers.discard(handler)
+
+    async def _on_event(self, connection, event, data):
+        if event == 'alias':
+            connection.send('named', 'Stumped')
+        elif event == 'play':
+            self._join(connection, data or {})
+        elif event == 'run':
+            await self._on_run(connection, data)
+        elif event == 'finished':
+            await self._on_finished(connection, data)
+
+    def _join(self, connection, data):
+        connection.name = data.get('playerName') or connection.name
+        requested = data.get('requestedSession') or '*'
+        session = None
+        if requested == '*':
+            session = next((s for s in self.sessions.values() if len(s.connections) == 1), None)
+        else:
+            session = self.sessions.get(requested)
+            if session and len(session.connections) > 1:
+                session = None
+
+        if session is None:
+            self._session_count += 1
+            name = requested if requested != '*' else str(self._session_count)
+            if name in self.sessions:
+                name = '{}-{}'.format(name, self._session_count)
+            session = _Session(name)
+            self.sessions[name] = session
+
+        connection.session = session
+        session.connections.append(connection)
+        connection.send('lobbied', {
+            'gameName': 'Stumped',
+            'gameSession': session.name,
+            'constants': {
+                'DELTA_REMOVED': DELTA_REMOVED,
+                'DELTA_LIST_LENGTH': DELTA_LIST_LENGTH,
+            },
+        })
+
+        if len(session.connections) == 2:
+            self._start(session)
+
+    def _start(self, session):
+        seed = None if self.seed is None else self.seed + self._session_count
+        game = StumpedGame(session.name, [c.name for c in session.connections],
+                           self.width, self.height, self.max_turns, seed=seed)
+        session.game = game
+        session.started = time.perf_counter()
+        for connection, player in zip(session.connections, game.players):
+            connection.player = player
+
+        delta = game.pop_delta()
+        for connection in session.connections:
+            connection.send('delta', delta)
+            connection.send('start', {'playerID': connection.player.id})
+        self._send_order(session)
+
+    def _send_order(self, session):
+        for connection in session.connections:
+            if connection.player is session.game.current_player:
+                session.order_index += 1
+                connection.send('order', {'name': 'runTurn', 'index': session.order_index, 'args': []})
+
+    def _broadcast_delta(self, session):
+        delta = session.game.pop_delta()
+        if delta:
+            for connection in session.connections:
+                connection.send('delta', delta)
+
+    async def _on_run(self, connection, data):
+        session = connection.session
+        game = session.game
+        returned = None
+        if game:
+            session.commands += 1
+            try:
+                args = data.get('args') or {}
+                caller = game.game_objects.get((data.get('caller') or {}).get('id'))
+                returned = game.run(connection.player, caller, data.get('functionName'), args)
+            except (InvalidCommand, TypeError) as e:
+                connection.send('invalid', {'message': str(e)})
+                returned = None if data.get('functionName') == 'recruit' else False
+            self._broadcast_delta(session)
+        connection.send('ran', returned)
+        if game and game.over:
+            await self._end_session(session)
+
+    async def _on_finished(self, connection, data):
+        session = connection.session
+        game = session.game
+        if not game or game.over or connection.player is not game.current_player:
+            return
+
+        if data.get('returned'):
+            game.end_turn()
+        self._broadcast_delta(session)
+        if game.over:
+            await self._end_session(session)
+        else:
+            self._send_order(session)
+
+    async def _end_session(self, session):
+        if session.name not in self.sessions:
+            return
+        del self.sessions[session.name]
+
+        self._broadcast_delta(session)
+        for connection in session.connections:
+            connection.send('over', {})
+
+        game = session.game
+        elapsed = time.perf_counter() - session.started
+        self.finished.append((session.name, game.current_turn, elapsed, session.commands))
+        print('Game "{}" over after {} turns in {:.2f} s: {:.1f} turns/s, {:.0f} commands/s'.format(
+            session.name, game.current_turn, elapsed,
+            game.current_turn / elapsed, session.commands / elapsed))
+
+        if self.games and len(self.finished) >= self.games and not self._done.done():
+            self._done.set_result(True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs a stand-in Stumped game server for testing the client locally.')
+    parser.add_argument('--host', default='localhost', help='the hostname to listen on')
+    parser.add_argument('-p', '--port', type=int, default=3000, help='the port to listen on')
+    parser.add_argument('--width', type=int, default=32, help='tiles along the x axis of each map')
+    parser.add_argument('--height', type=int, default=20, help='tiles along the y axis of each map')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to delay every frame the server sends by')
+    parser.add_argument('--maxTurns', type=int, dest='max_turns', default=500, help='turns before a game ends on lodge count')
+    parser.add_argument('--games', type=int, default=0, help='exit after this many games have ended, 0 to run forever')
+    parser.add_argument('--seed', type=int, default=None, help='seed for generating maps')
+    args = parser.parse_args()
+
+    server = LocalServer(args.width, args.height, args.latency, args.max_turns,
+                         args.games, args.seed)
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.close()
+
+    if server.finished:
+        turns = sum(game[1] for game in server.finished)
+        seconds = sum(game[2] for game in server.finished)
+        print('{} games, {:.1f} turns/s overall'.format(len(server.finished), turns / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# PathFinder: A* search over the map's Graph by tile index, for AI.find_path.
+# The moves and their costs are the graph's and which tiles are blocked is the
+# game's occupancy mask, so a search only touches ints.
+import heapq
+
+_INFINITY = float('inf')
+
+
+class PathFinder():
+    """Finds the cheapest paths between sets of tiles on one game's map.
+
+    It finds exactly the path the uniform cost search AI.find_path used to:
+    the search stops at the tile next to a goal that is cheapest to get to,
+    and ties (in cost, and between equally cheap ways to get to a tile) go to
+    the tile that is first in Tile's order, as the search's heap broke them.
+    """
+
+    def __init__(self, graph):
+        """
+        Args:
+            graph (Graph): the map to search
+        """
+        self._graph = graph
+        size = graph.size
+        self._x = [index % graph.width for index in range(size)]
+        self._y = [index // graph.width for index in range(size)]
+
+        # g scores and parents of every tile, valid for the search their stamp is from
+        self._search = 0
+        self._stamp = [0] * size
+        self._expanded = [0] * size
+        self._g = [0] * size
+        self._parent = [0] * size
+
+    def find_path(self, start_tiles, goal_tiles):
+        """Finds the cheapest path from any of the start tiles to next to any
+        of the goal tiles, see AI.find_path.
+
+        Returns:
+            list[Tile]: from a start tile to a goal tile, both included, or
+            empty if no goal can be reached
+        """
+        graph = self._graph
+        tiles, index = graph.tiles, graph.index
+        goals = {index(tile) for tile in goal_tiles if tile is not None}
+        if not goals:
+            return []
+        heuristic = self._heuristic(goals)
+
+        self._search += 1
+        search = self._search
+        stamp, expanded, g, parent = self._stamp, self._expanded, self._g, self._parent
+        offsets, targets, costs = graph.offsets, graph.targets, graph.costs
+        blocked, rank = graph.game.blocked_mask(), graph.ranks
+
+        heap = []
+        counter = 0  # breaks ties in the heap, which pops them in any order
+        for tile in start_tiles:
+            start = index(tile)
+            if stamp[start] != search:
+                stamp[start] = search
+                g[start] = 0
+                parent[start] = start
+                heap.append((heuristic(start), counter, start))
+                counter += 1
+        heapq.heapify(heap)
+
+        # the tile next to a goal that is cheapest to get to, and that goal.
+        # Tiles next to goals are where searching ends, so are not expanded
+        end = goal = None
+        end_g = _INFINITY
+        while heap:
+            f, _, current = heapq.heappop(heap)
+            if f > end_g:
+                break  # nothing left could get next to a goal as cheaply
+            if expanded[current] == search:
+                continue
+            expanded[current] = search
+            current_g = g[current]
+
+            next_to_goal = None
+            for neighbor in targets[offsets[current]:offsets[current + 1]]:
+                if neighbor in goals:
+                    next_to_goal = neighbor
+                    break
+            if next_to_goal is not None:
+                if current_g < end_g or (current_g == end_g and rank[current] < rank[end]):
+                    end, goal, end_g = current, next_to_goal, current_g
+                continue
+
+            current_rank = rank[current]
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[edge]
+                if blocked[neighbor]:
+                    continue
+                neighbor_g = current_g + costs[edge]
+                if stamp[neighbor] != search or neighbor_g < g[neighbor]:
+                    stamp[neighbor] = search
+                    g[neighbor] = neighbor_g
+                    parent[neighbor] = current
+                    heapq.heappush(heap, (neighbor_g + heuristic(neighbor), counter, neighbor))
+                    counter += 1
+                elif neighbor_g == g[neighbor]:
+                    # as cheap another way, which the old search kept if it
+                    # got there first, searching in order of cost then Tile
+                    previous = parent[neighbor]
+                    if current_g < g[previous] or (current_g == g[previous] and current_rank < rank[previous]):
+                        parent[neighbor] = current
+
+        if end is None:
+            return []
+        steps = [tiles[goal]]
+        step = end
+        while parent[step] != step:
+            steps.append(tiles[step])
+            step = parent[step]
+        steps.append(tiles[step])
+        steps.reverse()
+        return steps
+
+    def _heuristic(self, goals):
+        """Makes the A* heuristic for a set of goals: a lower bound on the
+        cost to get next to one, as every move costs at least 1. For a few
+        goals it is the distance to the nearest, otherwise to the box around
+        them all."""
+        xs, ys = self._x, self._y
+        if len(goals) <= 4:
+            points = [(xs[goal], ys[goal]) for goal in goals]
+
+            def heuristic(index):
+                x, y = xs[index], ys[index]
+                distance = min(abs(x - goal_x) + abs(y - goal_y) for goal_x, goal_y in points)
+                return distance - 1 if distance > 1 else 0
+            return heuristic
+
+        left = min(xs[goal] for goal in goals)
+        right = max(xs[goal] for goal in goals)
+        top = min(ys[goal] for goal in goals)
+        bottom = max(ys[goal] for goal in goals)
+
+        def heuristic(index):
+            x, y = xs[index], ys[index]
+            distance = max(left - x, 0, x - right) + max(top - y, 0, y - bottom)
+            return distance - 1 if distance > 1 else 0
+        return heuristic
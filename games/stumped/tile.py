@@ -33,6 +33,10 @@ class Tile(GameObject):
         self._x = 0
         self._y = 0
 
+        # the tiles linked to this one, built when first asked for, see get_neighbors
+        self._adjacent = None
+        self._neighbors = None
+
     @property
     def beaver(self):
         """The Beaver on this Tile if present, otherwise None.
@@ -141,18 +145,41 @@ class Tile(GameObject):
     """int: The valid directions that tiles can be in, "North", "East", "South", or "West"
     """
 
+    _direction_index = {direction: index for index, direction in enumerate(directions)}
+    _links = frozenset(("_tile_north", "_tile_east", "_tile_south", "_tile_west"))
+    """set[str]: The attributes linking tiles, when one changes the tile's neighbors are rebuilt
+    """
+    _blockers = frozenset(("_beaver", "_spawner", "_lodge_owner"))
+    """set[str]: The attributes that make a tile not pathable, when one changes the game's occupancy version goes up
+    """
+
     def get_neighbors(self):
-        """Gets the neighbors of this Tile
-        :rtype list[Tile]
+        """Gets the neighbors of this Tile. The map never changes after the game starts,
+        so this is the same tuple each time unless the tile's links change.
+        :rtype tuple[Tile]
         """
-        neighbors = []
+        if self._adjacent is None:
+            self._link()
+        return self._neighbors
 
-        for direction in Tile.directions:
-            neighbor = getattr(self, "tile_" + direction.lower())
-            if neighbor:
-                neighbors.append(neighbor)
+    def get_adjacent(self, direction):
+        """Gets the neighbor of this Tile in a direction
+        Args:
+            direction (str): "North", "East", "South", or "West"
+        Returns:
+            Tile: the neighboring Tile, or None if there is none
+        """
+        if self._adjacent is None:
+            self._link()
+        return self._adjacent[self._direction_index[direction]]
 
-        return neighbors
+    def _link(self):
+        self._adjacent = (self._tile_north, self._tile_east, self._tile_south, self._tile_west)
+        self._neighbors = tuple(tile for tile in self._adjacent if tile)
+
+    def _unlink(self):
+        self._adjacent = None
+        self._neighbors = None
 
     def is_pathable(self):
         """Checks if a Tile is pathable to units
@@ -168,11 +195,9 @@ class Tile(GameObject):
         Returns:
             bool: True if the tile is a neighbor of this Tile, False otherwise
         """
-        return bool(tile and tile in self.get_neighbors())
-    def __eq__(self, other):
-        return self.id == other.id
-
-    def __lt__(self, other):
-        return self.id < other.id
-    def __hash__(self):
-        return int(self.id)
+        if not tile:
+            return False
+        for neighbor in self.get_neighbors():
+            if neighbor is tile:
+                return True
+        return False
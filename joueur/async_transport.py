@@ -0,0 +1,94 @@
+# AsyncioTransport: runs the connection to the server on an asyncio event
+# loop in a background thread, see joueur/transport.py for the interface
+import asyncio
+import queue
+import socket
+import threading
+from joueur.frame_decoder import FrameDecoder
+from joueur.transport import TransportClosed
+
+
+class AsyncioTransport():
+    """Reads from the server with a StreamReader as soon as data arrives, so
+    frames are split and decoded while the AI is busy planning its turn.
+
+    The thread waiting on the server blocks on a queue of complete frames
+    instead of polling the socket on a timeout, so it wakes up the moment a
+    frame is complete. Writes are handed to the loop's StreamWriter, which
+    takes care of partial sends.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._writer = None
+        self._read_task = None
+        self._frames = queue.Queue()  # lists of frames, or the error to raise
+        self._closed = False
+
+    def connect(self, hostname, port):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run_loop, name='joueur-io', daemon=True)
+        self._thread.start()
+
+        # errors connecting are re-raised here, on the calling thread
+        asyncio.run_coroutine_threadsafe(
+            self._open(hostname, port), self._loop).result()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _open(self, hostname, port):
+        reader, self._writer = await asyncio.open_connection(hostname, port)
+
+        # command frames are small and we wait on their replies, so don't let
+        # Nagle's algorithm hold them back
+        self._writer.get_extra_info('socket').setsockopt(
+            socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._read_task = self._loop.create_task(self._read(reader))
+
+    async def _read(self, reader):
+        decoder = FrameDecoder()
+        try:
+            while True:
+                received = await reader.read(decoder.recv_size)
+                if not received:
+                    break
+
+                frames = decoder.feed(received)
+                if frames:
+                    self._frames.put(frames)
+        except Exception as e:
+            self._frames.put(e)
+        finally:
+            # cancelled by close() too, so nothing waits on the queue forever
+            self._frames.put(TransportClosed())
+
+    def send(self, data):
+        self._loop.call_soon_threadsafe(self._writer.write, data)
+
+    def recv_frames(self):
+        if self._closed:
+            # as reading a closed socket does, see SocketTransport
+            raise OSError('The connection to the server was closed')
+        frames = self._frames.get()
+        if isinstance(frames, Exception):
+            raise frames
+        return frames
+
+    def close(self):
+        self._closed = True
+        if self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._shutdown)
+
+    def _shutdown(self):
+        if self._writer:
+            self._writer.close()
+        if self._read_task and not self._read_task.done():
+            # let the reader finish cancelling before the loop stops
+            self._read_task.add_done_callback(lambda task: self._loop.stop())
+            self._read_task.cancel()
+        else:
+            self._loop.stop()
@@ -2,6 +2,7 @@
 from joueur.utilities import camel_case_converter
 import joueur.error_code as error_code
 import joueur.ansi_color_coder as color
+import inspect
 import sys
 
 
@@ -11,6 +12,7 @@ class BaseAI:
         self._game = game
         self._player = None
         self._settings = {}
+        self._updated_takes_changes = None
 
     def set_player(self, player):
         self._player = player
@@ -52,14 +54,45 @@ class BaseAI:
         """
         return self._settings[key] if key in self._settings else None
 
+    def pipelined(self):
+        """Sends the commands made inside this `with` block back to back,
+        without waiting for the server to reply to each one first.
+
+        Inside the block game object functions return a RunFuture instead of
+        their value. Reading `result()` (or using it as a bool) waits for
+        that command's reply. The game state is only guaranteed to reflect
+        the commands sent once the block exits, so only batch commands that
+        do not depend on each other's effects.
+
+        Returns:
+            A context manager to use in a `with` statement
+        """
+        import joueur.client  # avoid circular imports (sphinx won't build docs otherwise)
+        return joueur.client.client_of(self._game).pipelined()
+
     # intended to be overridden by the AI class
     def start(self):
         pass
 
     # intended to be overridden by the AI class
-    def game_updated(self):
+    def game_updated(self, changes=None):
         pass
 
+    # calls game_updated with what changed, unless it was overridden without
+    # taking the changes
+    def _game_updated(self, changes):
+        if self._updated_takes_changes is None:
+            try:
+                signature = inspect.signature(self.game_updated)
+                self._updated_takes_changes = len(signature.parameters) > 0
+            except (TypeError, ValueError):
+                self._updated_takes_changes = False
+
+        if self._updated_takes_changes:
+            self.game_updated(changes)
+        else:
+            self.game_updated()
+
     # intended to be overridden by the AI class
     def _do_order(self, order, arguments):
         callback = getattr(self, camel_case_converter(order))
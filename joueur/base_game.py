@@ -1,16 +1,94 @@
 from joueur.delta_mergeable import DeltaMergeable
+import joueur.snapshot
 
 
 # @class BaseGame: the basics of any game
 class BaseGame(DeltaMergeable):
+    _last_changes = None
+
     def __init__(self):
         DeltaMergeable.__init__(self)
+        self._journal = [] # (object, attribute, previous value) of every write made in the open snapshots
+        self._snapshots = [] # the open snapshots, oldest first
+        self._game_objects_by_index = [] # every game object created, by its index, None once removed from the game
+        self._tombstones = {} # id -> the game objects most recently removed from the game, see GameManager
+
+    @property
+    def last_changes(self):
+        """What the last delta merged into the game changed, or None before the first one.
+
+        :rtype: joueur.game_manager.DeltaChanges
+        """
+        return self._last_changes
+
+    def _delta_merged(self, changes):
+        """ Called after each delta is merged, for games to keep anything they derive from their state up to date
+
+        Args:
+            changes (DeltaChanges): what the delta changed
+        """
+        pass
+
+    def snapshot(self):
+        """ Takes a snapshot of the game's state, to try out changes to it with set_field and mutable_field then roll them back.
+        Taking one copies nothing, and rolling back only undoes the writes made since. Snapshots can be nested.
+        Any open snapshots are rolled back before the next delta from the server is merged.
+
+        Returns:
+            Snapshot: the open snapshot, which rolls back when a `with` statement using it exits
+        """
+        return joueur.snapshot.take(self)
+
+    def rollback(self, snapshot=None):
+        """ Undoes every change made since snapshot was taken, closing it and any snapshots taken after it
+
+        Args:
+            snapshot (Snapshot): the snapshot to go back to, by default the oldest one open
+        """
+        joueur.snapshot.rollback(self, snapshot)
 
-    def get_game_object(self, id):
+    def set_field(self, obj, field, value):
+        """ Sets one field of a game object (or the game) until the newest open snapshot is rolled back
+
+        Args:
+            obj (BaseGameObject): the game object, or the game itself
+            field (str): the field's name, e.g. 'branches' for Tile.branches
+            value: the value to give it
+        """
+        joueur.snapshot.set_field(self, obj, field, value)
+
+    def mutable_field(self, obj, field):
+        """ Gets a list or dict field of a game object (or the game) to change in place until the newest open snapshot is rolled back.
+        The first time in a snapshot it is copied and the copy put in its place, so the original is left as it was
+
+        Args:
+            obj (BaseGameObject): the game object, or the game itself
+            field (str): the field's name, e.g. 'beavers' for Player.beavers
+
+        Returns:
+            list or dict: the field's value, safe to change
+        """
+        return joueur.snapshot.mutable_field(self, obj, field)
+
+    def get_game_object_by_index(self, index):
+        """ gets the game object with the given index, which game objects are numbered by as they are created
+
+        Returns:
+            BaseGameObject: the game object, or None if it has since been removed from the game
+        """
+        return self._game_objects_by_index[index]
+
+    def get_game_object(self, id, removed=False):
         """ gets the game object with the given id, or None
 
+        Args:
+            id (str): the game object's id
+            removed (bool): to also look among the game objects most recently removed from the game
+
         Returns:
             BaseGameObject in the game with the given id, or None if not found
         """
         if id in self.game_objects:
             return self.game_objects[id]
+        if removed:
+            return self._tombstones.get(id)
@@ -4,8 +4,27 @@ from joueur.delta_mergeable import DeltaMergeable
 # the base class that every game object within a game inherit from for Python
 # manipulation that would be redundant via Creer
 class BaseGameObject(DeltaMergeable):
+    __slots__ = ()
     def __init__(self):
         DeltaMergeable.__init__(self)
+        self._index = -1 # dense index the GameManager gives it when created, see BaseGame.get_game_object_by_index
+
+    # game objects hash, compare and order by their index, so sets, dicts and heaps of them don't parse or hash their string ids.
+    # One no GameManager made has no index yet (-1), so it is only equal to itself and hashes by identity, as any object does
+    def __eq__(self, other):
+        if isinstance(other, BaseGameObject):
+            index = self._index
+            return index == other._index if index >= 0 else self is other
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, BaseGameObject):
+            return self._index < other._index
+        return NotImplemented
+
+    def __hash__(self):
+        index = self._index
+        return index if index >= 0 else object.__hash__(self)
 
     def __str__(self):
         return "{} #{}".format(self.game_object_name, self.id)
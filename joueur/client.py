@@ -1,241 +1,587 @@
-import socket
 import errno
 import sys
 import os
-import json
+import threading
 import time
-from joueur.serializer import serialize, deserialize
+from collections import deque
+from contextlib import contextmanager
+from joueur.serializer import serialize, deserialize, encode_run
+from joueur.codec import get_codec
 import joueur.error_code as error_code
 from joueur.game_manager import GameManager
+from joueur.transport import SocketTransport, TransportClosed
+from joueur.async_transport import AsyncioTransport
+from joueur.session_log import SessionRecorder, SENT, RECEIVED
+from joueur.metrics import Metrics
 import joueur.ansi_color_coder as color
 
-EOT_CHAR = chr(4)
-
-
-# Client: A singleton module that talks to the server receiving game
-# information and sending commands to execute. Clients perform no game logic
-class _Client:
-    socket = None
-
-_client = _Client()
-
-
-def connect(hostname='localhost', port=3000, print_io=False):
-    _client.hostname = hostname
-    _client.port = int(port)
+EOT_BYTE = b'\x04'
+
+# the kinds of transports the client can connect with, see joueur/transport.py
+transports = {
+    'asyncio': AsyncioTransport,
+    'socket': SocketTransport,
+}
+
+
+# raised out of whatever the session was doing when its game ends, for
+# clients that don't exit the process then
+class _GameOver(error_code.SessionError):
+    def __init__(self):
+        error_code.SessionError.__init__(self, error_code.NONE)
+
+
+# RunFuture: the eventual return value of a command sent while pipelined
+class RunFuture():
+    __slots__ = ('_client', '_done', '_value', '_function_name', '_sent_at')
+
+    def __init__(self, client, function_name=None, sent_at=None):
+        self._client = client
+        self._done = False
+        self._value = None
+        self._function_name = function_name
+        self._sent_at = sent_at  # perf_counter() when sent, for metrics
+
+    def done(self):
+        """True if the server has already replied to this command."""
+        return self._done
+
+    def result(self):
+        """Gets the value the server returned for this command, waiting for
+        it (and merging any deltas sent before it) if needed."""
+        if not self._done:
+            self._client._wait_for_future(self)
+        return self._value
+
+    def __bool__(self):
+        return bool(self.result())
+
+    def __repr__(self):
+        return 'RunFuture({})'.format(
+            repr(self._value) if self._done else 'pending')
+
+
+# Client: talks to the server for one game session, receiving game
+# information and sending commands to execute. Clients perform no game logic.
+# Each Game is bound to its own Client (game._client), so one process can
+# play many sessions at once, one per thread (see joueur/launcher.py). The
+# module level functions below use the default client, for one session
+class Client():
+    transport = None
+    recorder = None
+    metrics = None
+    gc_control = None  # a joueur.gc_control.GcControl, see --gc
+    memory_profiler = None  # a joueur.memprofile.MemoryProfiler, see --memprofile
+    game = None
+
+    def __init__(self, standalone=True):
+        # a standalone client is the only one in its process, so it exits the
+        # process when its game is over or errors. Otherwise it disconnects
+        # and raises error_code.SessionError, leaving the process running
+        self.standalone = standalone
+        self.result = None  # (won, reason) once the game is over
+
+        # the functions that handle each event the server can send, by name
+        self._handlers = {
+            'delta': self._auto_handle_delta,
+            'order': self._auto_handle_order,
+            'ran': self._auto_handle_ran,
+            'invalid': self._auto_handle_invalid,
+            'fatal': self._auto_handle_fatal,
+            'over': self._auto_handle_over,
+        }
+
+    # transport is the name of one of the transports above, or a transport
+    # object to use as is (e.g. a ReplayTransport). If record is a path every
+    # frame sent and received gets recorded there, see joueur/session_log.py.
+    # If metrics is a path, timings and sizes are collected and dumped there
+    # when the game is over, see joueur/metrics.py
+    def connect(self, hostname='localhost', port=3000, print_io=False,
+                transport='asyncio', codec=None, record=None, metrics=None):
+        _thread_state.client = self  # errors on this thread are ours
+
+        self.hostname = hostname
+        self.port = int(port)
+        self.codec = get_codec(codec)  # the fastest one installed by default
+
+        self._print_io = print_io
+        self._events_stack = []
+        self._outgoing = []  # frames waiting for the next flush
+        self._pipelined = False
+        self._pending_runs = deque()  # RunFutures awaiting their 'ran' event
+
+        print(color.text('cyan') + 'Connecting to:', self.hostname + ':' + str(
+            self.port) + color.reset())
+
+        if record:
+            self.recorder = SessionRecorder(record)
+
+        if metrics:
+            self.metrics = Metrics()
+            self.metrics_path = metrics
+
+        try:
+            if isinstance(transport, str):
+                transport = transports[transport]()
+            self.transport = transport
+            self.transport.connect(self.hostname, self.port)
+        except OSError as e:
+            self._handle_error(
+                error_code.COULD_NOT_CONNECT,
+                e,
+                'Could not connect to {}:{}'.format(
+                    self.hostname,
+                    self.port
+                )
+            )
 
-    _client._print_io = print_io
-    _client._received_buffer = ""
-    _client._events_stack = []
-    _client._buffer_size = 1024
-    _client._timeout_time = 1.0
+    def setup(self, game, ai, manager):
+        self.game = game
+        self.ai = ai
+        self.manager = manager
+        game._client = self  # and so its game objects, see GameManager
+        manager.metrics = self.metrics
+
+    def _handle_error(self, code, e=None, message=None):
+        _thread_state.client = self
+        error_code.handle_error(code, e, message)
+
+    def _send_raw(self, string):
+        if self._print_io:
+            print(color.text('magenta') + 'TO SERVER --> ' + str(
+                string) + color.reset())
+        if self.recorder:
+            self.recorder.record(SENT, string[:-1])  # without the EOT
+        self._outgoing.append(string)
+
+    # writes every frame queued since the last flush to the server in one
+    # send. Happens automatically before waiting on the server, so frames
+    # queued during one step of the AI go out together
+    def flush(self):
+        if self._outgoing:
+            data = b''.join(self._outgoing)
+            del self._outgoing[:]
+            self.transport.send(data)
+
+    # queues an event to send to the server, see flush
+    def send(self, event, data):
+        self._send_raw(
+            self.codec.dumps({
+                'sentTime': int(time.time()),
+                'event': event,
+                'data': serialize(data)
+            }) + EOT_BYTE
+        )
 
-    print(color.text('cyan') + 'Connecting to:', _client.hostname + ':' + str(
-        _client.port) + color.reset())
+    def disconnect(self, exit_code=None):
+        if self.transport:
+            try:
+                self.flush()
+            except OSError:
+                pass  # the connection is already gone, nothing more to send
+            self.transport.close()
+
+        if self.recorder:
+            self.recorder.close()
+
+        if self.gc_control:
+            self.gc_control.stop()
+
+    def run_on_server(self, caller, function_name, args=None):
+        if not self._pipelined:
+            # the next 'ran' would otherwise belong to an earlier pipelined
+            # command
+            self.sync()
+
+        metrics = self.metrics
+        if metrics:
+            sent_at = time.perf_counter()
+
+        if args is None:
+            self.send('run', {
+                'caller': caller,
+                'functionName': function_name,
+                'args': args
+            })
+        else:
+            # the hot path, only the ids and values change between calls
+            self._send_raw(encode_run(int(time.time()), caller, function_name,
+                                      args).encode('utf-8') + EOT_BYTE)
+
+        if self._pipelined:
+            future = RunFuture(self, function_name,
+                               sent_at if metrics else None)
+            self._pending_runs.append(future)
+            return future
+
+        ran_data = self.wait_for_event('ran')
+        if metrics:
+            metrics.observe('run_rtt_seconds', time.perf_counter() - sent_at,
+                            function_name)
+        return deserialize(ran_data, self.game)
+
+    # while pipelined, commands are sent back to back without waiting for
+    # their 'ran' replies, and return RunFutures instead of their values
+    def set_pipelined(self, pipelined):
+        self._pipelined = bool(pipelined)
+        if not self._pipelined:
+            self.sync()
+
+    @contextmanager
+    def pipelined(self):
+        previous = self._pipelined
+        self._pipelined = True
+        try:
+            yield
+        finally:
+            self._pipelined = previous
+            if not previous:
+                self.sync()
+
+    # waits for every pipelined command sent so far to be replied to, so the
+    # game state reflects all of them
+    def sync(self):
+        if self._pending_runs:
+            self._wait_for_future(self._pending_runs[-1])
+
+    # handles events until the game is over
+    def play(self):
+        try:
+            while True:
+                self.wait_for_events()
+
+                while len(self._events_stack) > 0:
+                    self._auto_handle(*self._pop_event())
+        except _GameOver:
+            pass  # the game may end in the middle of the AI's turn
+
+    def wait_for_event(self, event):
+        while True:
+            self.wait_for_events()
+
+            while len(self._events_stack) > 0:
+                # the 'ran' being waited for can't be put off
+                sent_event, data = self._pop_event(defer_ran=event != 'ran')
+                if event is not None and sent_event == event:
+                    return data
+                else:
+                    self._auto_handle(sent_event, data)
+
+    # handles events as they come until the future's 'ran' arrives, leaving
+    # any events after it for whoever waits next
+    def _wait_for_future(self, future):
+        while not future._done:
+            self.wait_for_events()
+
+            while len(self._events_stack) > 0 and not future._done:
+                self._auto_handle(*self._pop_event())
+
+    # pops the next event and its data off the stack. A delta followed by
+    # more deltas is folded together with them (see GameManager.fold_deltas)
+    # so the game is merged and the AI updated once for all of them. The
+    # 'ran' events of pipelined commands between them are put off until
+    # after the folded delta, if defer_ran
+    def _pop_event(self, defer_ran=True):
+        stack = self._events_stack
+        sent = stack.pop()
+        data = sent['data'] if 'data' in sent else None
+        if sent['event'] != 'delta' or not stack:
+            return sent['event'], data
+
+        deferred = []  # 'ran' events skipped over, in order
+        folded = 0
+        while stack:
+            upcoming = stack[-1]
+            if upcoming['event'] == 'delta':
+                combined = self.manager.fold_deltas(data, upcoming['data'])
+                if combined is None:
+                    break  # it has to be merged by itself, after this
+                data = combined
+                folded += 1
+                stack.pop()
+            elif upcoming['event'] == 'ran' and defer_ran and \
+                    len(deferred) < len(self._pending_runs):
+                deferred.append(stack.pop())
+            else:
+                break
 
-    try:
-        _client.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # back on the stack, to be handled right after the folded delta
+        stack.extend(reversed(deferred))
+        if folded and self.metrics:
+            self.metrics.count('deltas_folded_total', folded)
+        return 'delta', data
 
-        # Silly Windows
-        _client.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    # blocks until the server sends some complete events and stacks them up
+    def wait_for_events(self):
+        if len(self._events_stack) > 0:
+            return  # as we already have events to handle, no need to wait for more
 
-        # so the blocking on recv doesn't hang forever and other system
-        # interrupts (e.g. keyboard) can be handled
-        _client.socket.settimeout(_client._timeout_time)
-        _client.socket.connect((_client.hostname, _client.port))
-    except socket.error as e:
-        error_code.handle_error(
-            error_code.COULD_NOT_CONNECT,
-            e,
-            'Could not connect to {}:{}'.format(
-                _client.hostname,
-                _client.port
-            )
+        try:
+            try:
+                self.flush()
+                frames = self.transport.recv_frames()
+            except TransportClosed:
+                self._handle_error(
+                    error_code.DISCONNECTED_UNEXPECTEDLY,
+                    message='The server closed the connection')
+            except UnicodeDecodeError as e:
+                self._handle_error(error_code.MALFORMED_JSON, e,
+                                   'Could not decode data from server')
+            except OSError as e:
+                self._handle_error(
+                    error_code.CANNOT_READ_SOCKET, e,
+                    'Error using socket while waiting for events')
+
+            for json_str in frames:
+                if self._print_io:
+                    print(color.text('magenta') + 'FROM SERVER <-- ' +
+                          json_str + color.reset())
+                if self.recorder:
+                    self.recorder.record(RECEIVED, json_str.encode('utf-8'))
+
+            metrics = self.metrics
+            for json_str in reversed(frames):
+                if metrics:
+                    decode_start = time.perf_counter()
+                try:
+                    parsed = self.codec.loads(json_str)
+                except ValueError as e:
+                    self._handle_error(error_code.MALFORMED_JSON, e,
+                                       'Could not parse json "{}"'.format(
+                                           json_str)
+                                       )
+                if metrics:
+                    _record_received(metrics, json_str, parsed,
+                                     time.perf_counter() - decode_start)
+
+                self._events_stack.append(parsed)
+        except (KeyboardInterrupt, SystemExit):
+            self.disconnect()
+
+    def register_handler(self, event, handler):
+        """Sets the function called with the event's data whenever the server
+        sends the event to this client, replacing any previous handler."""
+        self._handlers[event] = handler
+
+    # called via the client run loop when data is sent
+    def _auto_handle(self, event, data=None):
+        handler = self._handlers.get(event)
+
+        if handler:
+            return handler(data)
+        else:
+            self._handle_error(error_code.UNKNOWN_EVENT_FROM_SERVER, message=(
+                'Could not auto handle event "{}".'.format(event)))
+
+    def _auto_handle_delta(self, data):
+        try:
+            changes = self.manager.apply_delta_state(data)
+        except:
+            self._handle_error(error_code.DELTA_MERGE_FAILURE, sys.exc_info(),
+                               'Error merging delta')
+
+        if self.ai.player:  # then the AI is ready for updates
+            self.ai._game_updated(changes)
+
+    def _auto_handle_ran(self, data):
+        if not self._pending_runs:
+            self._handle_error(
+                error_code.UNKNOWN_EVENT_FROM_SERVER,
+                message='Got a "ran" event with no command waiting for it.')
+
+        # the server replies to commands in the order they were sent
+        future = self._pending_runs.popleft()
+        future._value = deserialize(data, self.game)
+        future._done = True
+
+        if future._sent_at is not None:
+            self.metrics.observe('run_rtt_seconds',
+                                 time.perf_counter() - future._sent_at,
+                                 future._function_name)
+
+    def _auto_handle_order(self, data):
+        args = deserialize(data['args'], self.game)
+        metrics = self.metrics
+        if metrics:
+            order_start = time.perf_counter()
+        gc_control = self.gc_control
+        if gc_control:
+            gc_control.turn_started()
+        try:
+            returned = self.ai._do_order(data['name'], args)
+        except error_code.SessionError:
+            raise  # the session is already over, nothing more to report
+        except:
+            print('esc info', type(sys.exc_info()))
+            self._handle_error(error_code.AI_ERRORED, sys.exc_info(),
+                               'AI errored executing order "{}"'.format(
+                                   data['name']))
+        if metrics:
+            metrics.observe('order_seconds', time.perf_counter() - order_start,
+                            data['name'])
+
+        self.send("finished", {
+            'orderIndex': data['index'],
+            'returned': returned
+        })
+        if gc_control:
+            self.flush()  # so the server isn't kept waiting on the collection
+            gc_control.turn_finished()
+        if self.memory_profiler:
+            self.memory_profiler.turn_finished(self.game)
+
+    def _auto_handle_invalid(self, data):
+        try:
+            self.ai.invalid(data['message'])
+        except:
+            self._handle_error(error_code.AI_ERRORED, sys.exc_info(),
+                               'AI errored while handling invalid data.')
+
+    def _auto_handle_fatal(self, data):
+        self._handle_error(
+            error_code.FATAL_EVENT,
+            message='Got a fatal event from the server: ' + data['message']
         )
 
+    def _auto_handle_over(self, data):
+        won = self.ai.player.won
+        reason = self.ai.player.reason_won \
+            if self.ai.player.won \
+            else self.ai.player.reason_lost
+        self.result = (won, reason)
+
+        print('{}Game is Over. {} because {}{}'.format(
+            color.text('green'),
+            'I Won!' if won else 'I Lost :(',
+            reason,
+            color.reset()
+        ))
+
+        try:
+            self.ai.end(won, reason)
+        except:
+            self._handle_error(error_code.AI_ERRORED, sys.exc_info(),
+                               'AI errored during end.')
+
+        if 'message' in data:
+            message = data['message'].replace('__HOSTNAME__', self.hostname)
+            print(color.text('cyan') + message + color.reset())
+
+        if self.metrics:
+            self._dump_metrics()  # with the GC pauses in it, if any
+        elif self.gc_control:
+            print(self.gc_control.summary())
+        if self.memory_profiler:
+            self._write_memory_profile()
+
+        self.disconnect()
+        if self.standalone:
+            os._exit(0)
+        raise _GameOver()
+
+    def _write_memory_profile(self):
+        path = self.memory_profiler.path
+        try:
+            self.memory_profiler.write(self.game)
+        except OSError as e:
+            print('{}Could not write the memory profile to "{}": {}{}'.format(
+                color.text('red'), path, e, color.reset()))
+        else:
+            print('{}Memory profile written to "{}"{}'.format(
+                color.text('cyan'), path, color.reset()))
+
+    def _dump_metrics(self):
+        try:
+            self.metrics.dump(self.metrics_path)
+        except OSError as e:
+            print('{}Could not write metrics to "{}": {}{}'.format(
+                color.text('red'), self.metrics_path, e, color.reset()))
+        else:
+            print('{}Metrics written to "{}"{}'.format(
+                color.text('cyan'), self.metrics_path, color.reset()))
+        print(self.metrics.summary())
+
+
+def _record_received(metrics, json_str, parsed, decode_seconds):
+    event = parsed.get('event')
+    # the server's JSON is nearly always ASCII, which saves encoding it
+    size = len(json_str) if json_str.isascii() else len(
+        json_str.encode('utf-8'))
+    metrics.observe('decode_seconds', decode_seconds, event)
+    metrics.observe('frame_bytes', size, event)
+    metrics.count('received_frames_total')
+    metrics.count('received_bytes_total', size + 1)  # and its EOT
+
+
+# the client used by the module level functions, and by games not bound to
+# a client of their own
+_client = Client()
+
+# the client that last connected (or errored) on each thread, see current
+_thread_state = threading.local()
+
+
+def current():
+    """Gets the client the calling thread is playing its session with."""
+    return getattr(_thread_state, 'client', _client)
+
+
+def client_of(obj):
+    """Gets the client a game or game object is bound to."""
+    return getattr(obj, '_client', None) or _client
+
+
+def connect(hostname='localhost', port=3000, print_io=False,
+            transport='asyncio', codec=None, record=None, metrics=None):
+    _client.connect(hostname, port, print_io, transport, codec, record,
+                    metrics)
+
 
 def setup(game, ai, manager):
-    _client.game = game
-    _client.ai = ai
-    _client.manager = manager
+    _client.setup(game, ai, manager)
 
 
-def _send_raw(string):
-    if _client._print_io:
-        print(color.text('magenta') + 'TO SERVER --> ' + str(
-            string) + color.reset())
-    _client.socket.send(string)
+def flush():
+    _client.flush()
 
 
-# sends the server an event via socket
 def send(event, data):
-    _send_raw(
-        (json.dumps({
-            'sentTime': int(time.time()),
-            'event': event,
-            'data': serialize(data)
-        }) + EOT_CHAR).encode('utf-8')
-    )
+    _client.send(event, data)
 
 
 def disconnect(exit_code=None):
-    if _client.socket:
-        _client.socket.close()
+    _client.disconnect(exit_code)
 
 
 def run_on_server(caller, function_name, args=None):
-    send('run', {
-        'caller': caller,
-        'functionName': function_name,
-        'args': args
-    })
+    return _client.run_on_server(caller, function_name, args)
+
+
+def set_pipelined(pipelined):
+    _client.set_pipelined(pipelined)
+
 
-    ran_data = wait_for_event('ran')
-    return deserialize(ran_data, _client.game)
+def pipelined():
+    return _client.pipelined()
+
+
+def sync():
+    _client.sync()
 
 
 def play():
-    wait_for_event(None)
+    _client.play()
 
 
 def wait_for_event(event):
-    while True:
-        wait_for_events()
-
-        while len(_client._events_stack) > 0:
-            sent = _client._events_stack.pop()
-            data = sent['data'] if 'data' in sent else None
-            if event is not None and sent['event'] == event:
-                return data
-            else:
-                _auto_handle(sent['event'], data)
+    return _client.wait_for_event(event)
 
 
-# loops to check the socket for incoming data and ends once some events
-# get found
 def wait_for_events():
-    if len(_client._events_stack) > 0:
-        return  # as we already have events to handle, no need to wait for more
+    _client.wait_for_events()
 
-    try:
-        while True:
-            sent = None
-            try:
-                sent = _client.socket.recv(_client._buffer_size) \
-                    .decode('utf-8')
-            except socket.timeout:
-                pass  # timed out so keyboard/system interrupts can be handled,
-                #       hence the while true loop above
-            except socket.error as e:
-                error_code.handle_error(
-                    error_code.CANNOT_READ_SOCKET, e,
-                    'Error reading socket while waiting for events')
-
-            if not sent:
-                continue
-            elif _client._print_io:
-                print(color.text('magenta') + 'FROM SERVER <-- ' + str(
-                    sent) + color.reset())
 
-            split = (_client._received_buffer + sent).split(EOT_CHAR)
-            # the last item will either be "" if the last char was an EOT_CHAR,
-            #   or a partial data we need to buffer anyways
-            _client._received_buffer = split.pop()
-
-            for json_str in reversed(split):
-                try:
-                    parsed = json.loads(json_str)
-                except ValueError as e:
-                    error_code.handle_error(error_code.MALFORMED_JSON, e,
-                                            'Could not parse json ""'.format(
-                                                json_str)
-                                            )
-
-                _client._events_stack.append(parsed)
-
-            if len(_client._events_stack) > 0:
-                return
-    except (KeyboardInterrupt, SystemExit):
-        disconnect()
-
-
-# called via the client run loop when data is sent
-def _auto_handle(event, data=None):
-    # the current module, e.g. the Client module that acts as a singleton
-    g = globals()
-    auto_handle_function = g['_auto_handle_' + event]
-
-    if auto_handle_function:
-        return auto_handle_function(data)
-    else:
-        error_code.handle_error(error_code.UNKNOWN_EVENT_FROM_SERVER, message=(
-            'Could not auto handle event "{}".'.format(event)))
-
-
-def _auto_handle_delta(data):
-    try:
-        _client.manager.apply_delta_state(data)
-    except:
-        error_code.handle_error(error_code.DELTA_MERGE_FAILURE, sys.exc_info(),
-                                'Error merging delta')
-
-    if _client.ai.player:  # then the AI is ready for updates
-        _client.ai.game_updated()
-
-
-def _auto_handle_order(data):
-    args = deserialize(data['args'], _client.game)
-    try:
-        returned = _client.ai._do_order(data['name'], args)
-    except:
-        print('esc info', type(sys.exc_info()))
-        error_code.handle_error(error_code.AI_ERRORED, sys.exc_info(),
-                                'AI errored executing order "{}"'.format(
-                                    data.name))
-
-    send("finished", {
-        'orderIndex': data['index'],
-        'returned': returned
-    })
-
-
-def _auto_handle_invalid(data):
-    try:
-        _client.ai.invalid(data['message'])
-    except:
-        error_code.handle_error(error_code.AI_ERRORED, sys.exc_info(),
-                                'AI errored while handling invalid data.')
-
-
-def _auto_handle_fatal(data):
-    error_code.handle_error(
-        error_code.FATAL_EVENT,
-        message='Got a fatal event from the server: ' + data['message']
-    )
-
-
-def _auto_handle_over(data):
-    won = _client.ai.player.won
-    reason = _client.ai.player.reason_won \
-        if _client.ai.player.won \
-        else _client.ai.player.reason_lost
-
-    print('{}Game is Over. {} because {}{}'.format(
-        color.text('green'),
-        'I Won!' if won else 'I Lost :(',
-        reason,
-        color.reset()
-    ))
-
-    try:
-        _client.ai.end(won, reason)
-    except:
-        error_code.handle_error(error_code.AI_ERRORED, sys.exc_info(),
-                                'AI errored during end.')
-
-    if 'message' in data:
-        message = data['message'].replace('__HOSTNAME__', _client.hostname)
-        print(color.text('cyan') + message + color.reset())
-
-    disconnect()
-    os._exit(0)
+def register_handler(event, handler):
+    """Sets the function called with the event's data whenever the server
+    sends the event, replacing any previous handler for it."""
+    _client.register_handler(event, handler)
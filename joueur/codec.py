@@ -0,0 +1,99 @@
+# Codecs: turn the events sent to and from the server into JSON and back.
+# Every codec has the same interface:
+#     name
+#     dumps(obj)    returns the JSON for obj as UTF-8 bytes
+#     loads(data)   parses JSON from a str (or bytes), raising a ValueError
+#                   if it is malformed
+import json
+import math
+
+
+class JsonCodec():
+    """The standard library's json module, always available."""
+    name = 'json'
+
+    def dumps(self, obj):
+        return json.dumps(obj).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec():
+    """orjson, a much faster JSON library used when it is installed.
+
+    Anything orjson handles differently from the standard library is handed
+    to it, so both codecs send and receive the same data: what orjson refuses
+    to encode (e.g. integers over 64 bits), non-finite floats, which orjson
+    encodes as null rather than NaN or Infinity, and JSON orjson refuses to
+    parse, like NaN and Infinity.
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self._encode_error = orjson.JSONEncodeError
+        self._decode_error = orjson.JSONDecodeError
+        self._option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj):
+        try:
+            data = self._orjson.dumps(obj, option=self._option)
+        except self._encode_error:
+            return json.dumps(obj).encode('utf-8')
+        # orjson writes NaN and Infinity as null, so only then can there be any
+        if b'null' in data and _has_non_finite(obj):
+            return json.dumps(obj).encode('utf-8')
+        return data
+
+    def loads(self, data):
+        try:
+            return self._orjson.loads(data)
+        except self._decode_error:
+            return json.loads(data)  # raises a ValueError too if it is malformed
+
+
+def _has_non_finite(obj):
+    """Checks if obj has a NaN or infinite float anywhere in the dicts, lists
+    and tuples in it, as the serializer makes them."""
+    isfinite = math.isfinite
+    stack = [obj]
+    pop, extend = stack.pop, stack.extend
+    while stack:
+        value = pop()
+        cls = value.__class__
+        if cls is dict:
+            extend(value.values())
+            extend(value)
+        elif cls is list or cls is tuple:
+            extend(value)
+        elif cls is float and not isfinite(value):
+            return True
+    return False
+
+
+# codecs by name, in the order they are preferred when available
+codecs = {
+    'orjson': OrjsonCodec,
+    'json': JsonCodec,
+}
+
+
+def get_codec(name=None):
+    """Gets the codec with the given name, or the fastest one installed.
+
+    Args:
+        name (str): the name of a codec in `codecs`, or None to pick one
+
+    Returns:
+        an instance of the codec
+    """
+    if name is not None:
+        return codecs[name]()
+
+    for codec in codecs.values():
+        try:
+            return codec()
+        except ImportError:
+            continue  # not installed, try the next best
@@ -1,12 +1,15 @@
 class DeltaMergeable():
     """a game or game object that needs to be delta merged"""
 
+    __slots__ = ()  # so slotted game objects can have no __dict__, see joueur/slots.py
+    _client = None  # the joueur.client.Client playing the game this is in
+
     def __init__(self):
         pass
 
     def _run_on_server(self, function_name, **kwargs):
         import joueur.client # avoid circular imports (sphinx won't build docs otherwise)
-        return joueur.client.run_on_server(self, function_name, kwargs)
+        return joueur.client.client_of(self).run_on_server(self, function_name, kwargs)
 
     def __contains__(self, key):
         return hasattr(self, key)
@@ -26,12 +26,26 @@ import sys
 import joueur.ansi_color_coder as color
 import os
 
+
+class SessionError(Exception):
+    """Raised instead of exiting the process when a session that is not the
+    only one in its process errors, see joueur.client.Client."""
+
+    def __init__(self, error_code):
+        Exception.__init__(self, _by_code.get(error_code, error_code))
+        self.error_code = error_code
+
+
 def handle_error(error_code, e=None, message=None):
     if isinstance(e, SystemExit) or isinstance(e, KeyboardInterrupt): # we accidentally caught an exit exception, just re-throw it till it gets to the end of the runtime stack
         sys.exit(e.code)
 
+    if isinstance(sys.exc_info()[1], SessionError): # already handled by the session deeper in the stack, keep unwinding
+        raise sys.exc_info()[1]
+
     import joueur.client # avoid circular imports (sphinx won't build docs otherwise)
-    joueur.client.disconnect()
+    client = joueur.client.current()
+    client.disconnect()
 
     sys.stderr.write(color.text("red") + "---\nError: {}\n---".format(_by_code[error_code] if error_code in _by_code else "UNKNOWN ERROR {}".format(error_code)))
 
@@ -46,4 +60,6 @@ def handle_error(error_code, e=None, message=None):
         sys.stderr.write("---")
 
     sys.stderr.write("\n" + color.reset())
+    if not client.standalone:
+        raise SessionError(error_code)
     os._exit(error_code)
@@ -0,0 +1,69 @@
+# FrameDecoder: incrementally splits the raw bytes read from the server into
+# the EOT delimited frames of the protocol
+EOT_BYTE = b'\x04'
+
+
+class FrameDecoder():
+    """Buffers bytes as they arrive and decodes each complete frame once.
+
+    Only the newly arrived bytes are scanned for the EOT delimiter, and a
+    frame is decoded from UTF-8 only once all of its bytes are present, so a
+    multibyte character split across two reads is never broken.
+
+    The size to read from the socket next adapts to the traffic: it doubles
+    while reads keep filling it (e.g. the initial game state) and halves
+    back down once the server goes back to sending small frames.
+    """
+
+    def __init__(self, min_recv_size=1024, max_recv_size=1 << 20):
+        self._buffer = bytearray()
+        self._scanned = 0  # bytes at the front of _buffer known to hold no EOT
+        self.min_recv_size = min_recv_size
+        self.max_recv_size = max_recv_size
+        self.recv_size = min_recv_size
+
+    @property
+    def pending(self):
+        """The number of buffered bytes that are not yet part of a frame.
+
+        :rtype: int
+        """
+        return len(self._buffer)
+
+    def feed(self, data):
+        """Appends bytes read from the server.
+
+        Args:
+            data (bytes): the bytes just read
+
+        Returns:
+            list[str]: the complete frames found, in the order they were sent
+        """
+        self._adapt(len(data))
+
+        buffer = self._buffer
+        buffer.extend(data)
+
+        end = buffer.find(EOT_BYTE, self._scanned)
+        if end < 0:
+            self._scanned = len(buffer)
+            return []
+
+        frames = []
+        start = 0
+        with memoryview(buffer) as view:
+            while end >= 0:
+                frames.append(str(view[start:end], 'utf-8'))
+                start = end + 1
+                end = buffer.find(EOT_BYTE, start)
+
+        # dropping the front of a bytearray is cheap, it just moves its start
+        del buffer[:start]
+        self._scanned = len(buffer)
+        return frames
+
+    def _adapt(self, received):
+        if received >= self.recv_size:
+            self.recv_size = min(self.recv_size * 2, self.max_recv_size)
+        elif received < self.recv_size // 4:
+            self.recv_size = max(self.recv_size // 2, self.min_recv_size)
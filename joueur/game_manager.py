@@ -1,76 +1,347 @@
-from joueur.delta_mergeable import DeltaMergeable
-from joueur.base_game_object import BaseGameObject
+import time
 from joueur.utilities import camel_case_converter
-from joueur.serializer import is_game_object_reference, is_object
+from joueur.serializer import is_object
+from joueur.slots import slotted_classes, fields_of
+from joueur.log_buffer import LogBuffer
+
+TOMBSTONES = 1024 # how many of the game objects removed from the game are kept, for references to them that come late
 
 # @class GameManager: managed the game and it's game objects including unserializing deltas
 class GameManager():
-    def __init__(self, game):
+    ## if slotted, game objects are created from slotted variants of the game's classes, see joueur/slots.py.
+    # If max_logs, each game object keeps only that many of its newest logs, see joueur/log_buffer.py
+    def __init__(self, game, slotted=False, max_logs=None):
         self.game = game
+        self.max_logs = max_logs
         self._game_object_classes = game._game_object_classes
+        if slotted:
+            self._game_object_classes = slotted_classes(self._game_object_classes)
+        self.metrics = None  # a joueur.metrics.Metrics to record merges in
 
     def set_constants(self, constants):
         self._server_constants = constants
         self._DELTA_REMOVED = constants['DELTA_REMOVED']
         self._DELTA_LIST_LENGTH = constants['DELTA_LIST_LENGTH']
 
-    ## applies a delta state (change in state information) to this game
+        # how to merge deltas into each class, worked out once up front
+        self._objects = self.game._game_objects
+        self._tombstones = self.game._tombstones
+        self._appliers = {cls: DeltaApplier(self, cls) for cls in self._game_object_classes.values()}
+        self._appliers[self.game.__class__] = DeltaApplier(self, self.game.__class__)
+
+    ## applies a delta state (change in state information) to this game, returning the DeltaChanges it made
     def apply_delta_state(self, delta):
+        metrics = self.metrics
+        if metrics:
+            metrics.observe('delta_keys', _count_keys(delta))
+            start = time.perf_counter()
+
+        if self.game._snapshots: # the AI's what-ifs would be mixed into the server's state otherwise
+            self.game.rollback()
+
+        self._changes = changes = DeltaChanges()
         if 'gameObjects' in delta:
             self._init_game_objects(delta['gameObjects'])
 
         self._merge_delta(self.game, delta)
 
+        self.game._last_changes = changes
+        self.game._delta_merged(changes)
+
+        if metrics:
+            metrics.observe('delta_merge_seconds', time.perf_counter() - start)
+        return changes
+
+    ## combines two deltas into one that changes the game the same as merging the first then the second.
+    # Returns None when they can't be combined, e.g. the second changes the insides of something the first removes
+    def fold_deltas(self, first, second):
+        list_length_key = self._DELTA_LIST_LENGTH
+        folded = dict(first)
+
+        for key, value in second.items():
+            if value.__class__ is not dict or (len(value) == 1 and 'id' in value):
+                folded[key] = value # a value, reference or removal simply replaces whatever the first did
+                continue
+
+            previous = folded.get(key)
+            if previous is None and key not in folded:
+                folded[key] = value # the first didn't touch it, so the second merges into the same thing
+            elif previous.__class__ is dict and not (len(previous) == 1 and 'id' in previous):
+                if list_length_key in value:
+                    previous, value = self._fold_list_lengths(previous, value)
+                    if previous is None:
+                        return None
+                nested = self.fold_deltas(previous, value)
+                if nested is None:
+                    return None
+                folded[key] = nested
+            else:
+                return None # merging into something the first replaced with a value, reference or removal
+
+        return folded
+
+    ## readies two deltas of a list, the second setting its length, to be folded: drops the first's items the second cuts off,
+    # and sets the items the first cut off and the second grows back to None, as they would be after merging one then the other
+    def _fold_list_lengths(self, first, second):
+        list_length_key = self._DELTA_LIST_LENGTH
+        length = second[list_length_key]
+        first = {key: item for key, item in first.items() if key == list_length_key or int(key) < length}
+
+        if first.get(list_length_key, length) < length:
+            second = dict(second)
+            for index in range(first[list_length_key], length):
+                item = second.setdefault(str(index), None)
+                if item.__class__ is dict and not (len(item) == 1 and 'id' in item):
+                    return None, None # it would merge into what the item was before the first, not into a new one
+        return first, second
+
     ## game objects can be refences in the delta states for cycles, they will all point to the game objects here.
     def _init_game_objects(self, delta_game_objects):
+        by_index = self.game._game_objects_by_index
         for id, obj in delta_game_objects.items():
+            if obj == self._DELTA_REMOVED:
+                continue # removed, maybe before it was ever created
             if not id in self.game._game_objects: # then we need to create it
-                self.game._game_objects[id] = self._game_object_classes[obj['gameObjectName']]()
+                game_object = self._game_object_classes[obj['gameObjectName']]()
+                game_object._client = self.game._client # so it runs commands on the game's client
+                game_object._index = len(by_index)
+                by_index.append(game_object)
+                self.game._game_objects[id] = game_object
+                self._changes.created.append(game_object)
 
-    ## Correctly apply a single change to a member of a list, dict, or object
-    def _set_member(self, state, state_key, value):
-        if isinstance(state_key, int) or isinstance(state, dict):
-            state[state_key] = value
-        else:
-            setattr(state, state_key, value)
-
-    ## recursively merges delta changes to the game.
+    ## merges delta changes into the game, without changing the delta. Iterative, with a stack of the (state, delta) pairs left to merge
     def _merge_delta(self, state, delta):
-        delta_length = -1
-        if self._DELTA_LIST_LENGTH in delta:
-            delta_length = delta[self._DELTA_LIST_LENGTH]
-            del delta[self._DELTA_LIST_LENGTH] # we don't want to copy this key/value over to the state, it was just to signify it is an array
-
-        if delta_length > -1: # then this part in the state is an array
-            while len(state) > delta_length: # remove elements off the array to make it's size correct.
-                state.pop()
-            while len(state) < delta_length: # append elements on the array to make it's size correct.
-                state.append(None)
-
-        for key in delta: # deltas will always be objects when iterating through, arrays just have keys of numbers
-            d = delta[key]
-            state_key = key # array's keys are real numbers, not strings e.g. "1"
-            key_in_state = False
-
-            if isinstance(state, list):
-                state_key = int(key)
-                key_in_state = state_key < len(state)
+        appliers = self._appliers
+        stack = [(state, delta)]
+        while stack:
+            state, delta = stack.pop()
+            state_class = type(state) # not __class__, which slotted game objects give as the plain class
+            if state_class is list:
+                self._merge_list(state, delta, stack)
+            elif state_class is dict:
+                self._merge_dict(state, delta, stack)
+            else:
+                applier = appliers.get(state_class)
+                if applier is None: # not a class of the game, e.g. a subclass an AI made
+                    applier = appliers[state_class] = DeltaApplier(self, state_class)
+                applier.apply(state, delta, stack)
+
+    ## merges a delta into a list, its keys are indexes as strings plus the list's length
+    def _merge_list(self, state, delta, stack):
+        length = delta.get(self._DELTA_LIST_LENGTH)
+        if length is not None: # make the list the delta's length
+            del state[length:]
+            state.extend([None] * (length - len(state)))
+
+        list_length_key = self._DELTA_LIST_LENGTH
+        for key, value in delta.items():
+            if key == list_length_key:
+                continue
+            index = int(key)
+            if value.__class__ is dict:
+                if len(value) == 1 and 'id' in value: # a reference to a game object
+                    state[index] = self._resolve(value['id'])
+                else:
+                    current = state[index] if index < len(state) else None
+                    if not is_object(current):
+                        current = state[index] = [] if list_length_key in value else {}
+                    stack.append((current, value))
+            elif value == self._DELTA_REMOVED:
+                if index < len(state):
+                    del state[index]
+            else:
+                state[index] = value
+
+    ## merges a delta into a dict, like the game's game objects
+    def _merge_dict(self, state, delta, stack):
+        for key, value in delta.items():
+            if value.__class__ is dict:
+                if len(value) == 1 and 'id' in value: # a reference to a game object
+                    state[key] = self._resolve(value['id'])
+                else:
+                    current = state.get(key)
+                    if not is_object(current):
+                        current = state[key] = [] if self._DELTA_LIST_LENGTH in value else {}
+                    stack.append((current, value))
+            elif value == self._DELTA_REMOVED:
+                removed = state.pop(key, None)
+                if state is self._objects and removed is not None:
+                    self._bury(key, removed)
+                    self._changes.removed.append(removed)
+            else:
+                state[key] = value
+
+    ## gets the game object a reference is to, even if it was removed from the game not long ago
+    def _resolve(self, id):
+        return self._objects.get(id) or self._tombstones.get(id)
+
+    ## moves a game object removed from the game into the tombstones, letting go of the oldest one if there are too many
+    def _bury(self, id, game_object):
+        tombstones = self._tombstones
+        tombstones[id] = game_object
+        if len(tombstones) > TOMBSTONES:
+            del tombstones[next(iter(tombstones))]
+        by_index = self.game._game_objects_by_index
+        if 0 <= game_object._index < len(by_index) and by_index[game_object._index] is game_object:
+            by_index[game_object._index] = None
+
+    ## merges one field of a game object (or the game) that its applier has no faster way to merge
+    def _merge_attribute(self, obj, attribute, value, stack):
+        if value.__class__ is dict:
+            if len(value) == 1 and 'id' in value: # a reference to a game object
+                setattr(obj, attribute, self._resolve(value['id']))
             else:
-                if isinstance(state, DeltaMergeable):
-                    state_key = "_" + camel_case_converter(state_key)
-                key_in_state = state_key in state
-
-            if d == self._DELTA_REMOVED:
-                if key_in_state:
-                    del state[state_key]
-            elif is_game_object_reference(d): # then this is a shallow reference to a game object
-                referenced_object = self.game.get_game_object(d['id'])
-                self._set_member(state, state_key, referenced_object)
-            elif is_object(d) and key_in_state and is_object(state[state_key]):
-                self._merge_delta(state[state_key], d)
-            elif not key_in_state and is_object(d):
-                if isinstance(d, dict):
-                    state[state_key] = [] if d in self._DELTA_LIST_LENGTH else {}
-                    self._merge_delta(state[state_key], d)
+                current = getattr(obj, attribute, None)
+                if not is_object(current):
+                    current = [] if self._DELTA_LIST_LENGTH in value else {}
+                    setattr(obj, attribute, current)
+                stack.append((current, value))
+        elif value == self._DELTA_REMOVED:
+            if hasattr(obj, attribute):
+                delattr(obj, attribute)
+        else:
+            setattr(obj, attribute, value)
+
+
+## @class DeltaChanges: what merging one delta changed, so AIs can update what they track from it instead of rescanning the game
+class DeltaChanges():
+    def __init__(self):
+        self.created = [] # game objects new to the game
+        self.removed = [] # game objects taken out of the game
+        self.modified = {} # game object (or the game) -> set of its changed fields' private attributes, e.g. '_branches'
+
+    def fields(self, obj):
+        """ Gets the private attributes of obj's fields that changed, e.g. {'_branches', '_beaver'} for a Tile
+
+        Returns:
+            set[str]: the changed fields, empty if obj did not change
+        """
+        return self.modified.get(obj, _NO_FIELDS)
+
+    def changed(self, field):
+        """ Gets every game object (or the game) whose field changed
+
+        Args:
+            field (str): the field's private attribute, e.g. '_tile' for where Beavers are
+
+        Returns:
+            list: the objects whose field changed
+        """
+        return [obj for obj, fields in self.modified.items() if field in fields]
+
+    def __bool__(self):
+        return bool(self.created or self.removed or self.modified)
+
+
+_NO_FIELDS = frozenset()
+_UNKNOWN = object() # the default of a field a class doesn't start with
+
+
+## @class DeltaApplier: merges deltas into the fields of one class of game object (or the game).
+# Built once per class, it maps each key the server sends to the private attribute holding it
+# and to a handler for the kind of field it is, judged by the value the class starts it as
+class DeltaApplier():
+    def __init__(self, manager, cls):
+        self._manager = manager
+        self._handlers = {} # server key -> function(obj, value, stack)
+        self._attributes = {} # server key -> private attribute, for the DeltaChanges
+
+        for attribute, default in fields_of(cls()).items():
+            if attribute.startswith('_') and not attribute.startswith('__'):
+                key = _camel_case(attribute[1:])
+                if '_' + camel_case_converter(key) == attribute:
+                    self._handlers[key] = self._compile(attribute, default)
+                    self._attributes[key] = attribute
+
+    ## merges a delta into obj, pushing nested lists, dicts and game objects that need merging onto stack
+    def apply(self, obj, delta, stack):
+        handlers = self._handlers
+        attributes = self._attributes
+        for key, value in delta.items():
+            handler = handlers.get(key)
+            if handler is None:
+                attribute = attributes[key] = '_' + camel_case_converter(key)
+                handler = handlers[key] = self._compile(attribute)
+            handler(obj, value, stack)
+
+        # after the loop, which adds the attributes of keys not seen before
+        fields = {attributes[key] for key in delta}
+        existing = self._manager._changes.modified.setdefault(obj, fields)
+        if existing is not fields:
+            existing |= fields
+
+    ## makes the handler for a field from the value it starts as
+    def _compile(self, attribute, default=_UNKNOWN):
+        manager = self._manager
+        objects = manager._objects
+        tombstones = manager._tombstones
+        removed = manager._DELTA_REMOVED
+
+        if default is _UNKNOWN: # a key the class doesn't start with, so there's no telling what it will be
+            def merge_attribute(obj, value, stack):
+                manager._merge_attribute(obj, attribute, value, stack)
+            return merge_attribute
+
+        if attribute == '_logs' and manager.max_logs and isinstance(default, list):
+            capacity = manager.max_logs
+            list_length_key = manager._DELTA_LIST_LENGTH
+            def merge_logs(obj, value, stack):
+                if value.__class__ is not dict:
+                    manager._merge_attribute(obj, attribute, value, stack)
+                    return
+                logs = getattr(obj, attribute)
+                if logs.__class__ is not LogBuffer:
+                    length = value.get(list_length_key)
+                    if logs.__class__ is list and (length is None or length <= capacity):
+                        stack.append((logs, value)) # merged as any list, until it outgrows the cap
+                        return
+                    logs = LogBuffer(capacity, logs if logs.__class__ is list else ())
+                    setattr(obj, attribute, logs)
+                logs.merge(value, list_length_key)
+            return merge_logs
+
+        if isinstance(default, (list, dict)):
+            def merge_container(obj, value, stack):
+                if value.__class__ is dict:
+                    current = getattr(obj, attribute)
+                    if current.__class__ is list or current.__class__ is dict:
+                        stack.append((current, value))
+                        return
+                manager._merge_attribute(obj, attribute, value, stack)
+            return merge_container
+
+        if default is None: # game object fields start as None
+            def set_reference(obj, value, stack):
+                if value.__class__ is dict and len(value) == 1 and 'id' in value:
+                    setattr(obj, attribute, objects.get(value['id']) or tombstones.get(value['id']))
+                elif value is None:
+                    setattr(obj, attribute, None)
+                else:
+                    manager._merge_attribute(obj, attribute, value, stack)
+            return set_reference
+
+        def set_scalar(obj, value, stack):
+            if value.__class__ is not dict and value != removed:
+                setattr(obj, attribute, value)
             else:
-                self._set_member(state, state_key, d)
+                manager._merge_attribute(obj, attribute, value, stack)
+        return set_scalar
+
+
+## converts a snake_case name to the camelCase the server uses
+def _camel_case(name):
+    first, *rest = name.split('_')
+    return first + ''.join(word.title() for word in rest)
+
+
+## counts the keys in a delta at every depth, its size in changes
+def _count_keys(delta):
+    count = 0
+    stack = [delta]
+    while stack:
+        d = stack.pop()
+        count += len(d)
+        for value in d.values():
+            if isinstance(value, dict):
+                stack.append(value)
+    return count
@@ -0,0 +1,114 @@
+# GC control: keeps Python's cyclic garbage collector from pausing the AI in
+# the middle of its turn. The game's objects live as long as the game and are
+# full of reference cycles (tiles link to each other, beavers and tiles point
+# at each other), so otherwise every collection of an old generation rescans
+# the whole map, whenever it happens to trigger. See --gc in main.py.
+#
+# The collector is process wide, so when many sessions play in one process
+# (--sessions) each one's policy applies to all of them.
+import gc
+import time
+from joueur.metrics import Metrics
+
+# how each policy treats the collector:
+#     report  leaves it as it is, only reporting its pauses, to compare with
+#     freeze  once the initial state is merged, moves every object alive into
+#             the permanent generation, which is never scanned, and collects
+#             less often while the AI takes its turn
+#     turns   as freeze, but doesn't collect at all during the AI's turn,
+#             instead collecting the young generations after it, while the
+#             opponent plays, and freezing what survives. Now and then it
+#             collects fully, frozen objects too
+POLICIES = ('report', 'freeze', 'turns')
+
+# the collector's thresholds during a turn under 'freeze'
+_TURN_THRESHOLDS = (10000, 20, 100)
+
+# under 'turns', a full collection is made after this many turns, or once
+# this much more has been frozen than was left after the last one, as
+# CPython waits for its oldest generation to grow by a quarter
+_FULL_COLLECTION_TURNS = 100
+_FULL_COLLECTION_GROWTH = 0.25
+
+
+class GcControl():
+    """Applies a policy to the garbage collector as the game goes, and times
+    every collection (as gc_pause_seconds, by the phase of the game it
+    happened in) into metrics."""
+
+    def __init__(self, policy, metrics=None):
+        if policy not in POLICIES:
+            raise ValueError('Unknown GC policy "{}"'.format(policy))
+        self.policy = policy
+        self.metrics = metrics or Metrics()
+        self._phase = 'setup'
+        self._paused_at = None
+        self._thresholds = gc.get_threshold()
+        self._was_enabled = gc.isenabled()
+        self._turns_since_full = 0  # under 'turns', since the last full collection
+        self._frozen_after_full = 0  # and the objects frozen right after it
+        gc.callbacks.append(self._on_gc)
+
+    def _on_gc(self, phase, info):
+        if phase == 'start':
+            self._paused_at = time.perf_counter()
+        elif self._paused_at is not None:
+            self.metrics.observe('gc_pause_seconds',
+                                 time.perf_counter() - self._paused_at,
+                                 self._phase)
+            self.metrics.count('gc_collections_total', 1,
+                               'generation {}'.format(info['generation']))
+            self._paused_at = None
+
+    def game_started(self):
+        """Call once the initial state is merged and the AI has started."""
+        self._phase = 'between_turns'
+        if self.policy != 'report':
+            gc.collect()  # so the garbage from setting up isn't frozen with it
+            gc.freeze()
+            self._frozen_after_full = gc.get_freeze_count()
+
+    def turn_started(self):
+        self._phase = 'turn'
+        if self.policy == 'turns':
+            gc.disable()
+        elif self.policy == 'freeze':
+            gc.set_threshold(*_TURN_THRESHOLDS)
+
+    def turn_finished(self):
+        """Call once the turn is sent, so collecting doesn't hold it up."""
+        self._phase = 'between_turns'
+        if self.policy == 'turns':
+            gc.enable()
+            # only what was made since the last turn, the rest is frozen
+            gc.collect(1)
+            gc.freeze()
+            self._turns_since_full += 1
+            if (self._turns_since_full >= _FULL_COLLECTION_TURNS or
+                    gc.get_freeze_count() > self._frozen_after_full * (1 + _FULL_COLLECTION_GROWTH)):
+                self._collect_fully()
+        elif self.policy == 'freeze':
+            gc.set_threshold(*self._thresholds)
+
+    def _collect_fully(self):
+        # of the frozen objects too, so cycles that became garbage after they
+        # were frozen are still freed
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+        self._turns_since_full = 0
+        self._frozen_after_full = gc.get_freeze_count()
+
+    def stop(self):
+        """Puts the collector back as it was."""
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        gc.set_threshold(*self._thresholds)
+        if self._was_enabled:
+            gc.enable()
+        if self.policy != 'report':
+            gc.unfreeze()
+
+    def summary(self):
+        """The pauses and collections, for the terminal."""
+        return self.metrics.summary()
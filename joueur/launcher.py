@@ -0,0 +1,76 @@
+# Launcher: plays many game sessions at once in one process, each on its own
+# thread with its own Client, so running lots of matches doesn't pay for
+# starting an interpreter per match
+import copy
+import os
+import threading
+import time
+import joueur.client
+import joueur.error_code as error_code
+from joueur.run import run
+import joueur.ansi_color_coder as color
+
+
+def launch(args, sessions):
+    """Plays sessions games with the arguments from main.py, concurrently.
+
+    Files the sessions write (--record, --metrics, --memprofile) get the session's number
+    added before their extension so they don't overwrite each other.
+
+    Returns:
+        int: 0 if every session played to the end, otherwise the error code
+        of the first one that did not
+    """
+    results = [None] * sessions
+    start = time.perf_counter()
+
+    def play(index):
+        session_args = copy.copy(args)
+        session_args.record = _numbered(args.record, index)
+        session_args.metrics = _numbered(args.metrics, index)
+        session_args.memprofile = _numbered(args.memprofile, index)
+        try:
+            results[index] = run(session_args,
+                                 joueur.client.Client(standalone=False))
+        except error_code.SessionError as e:
+            results[index] = e  # already reported by the session
+        except Exception as e:
+            results[index] = error_code.SessionError(error_code.AI_ERRORED)
+            print('{}Session {} crashed: {}{}'.format(
+                color.text('red'), index, e, color.reset()))
+
+    threads = [threading.Thread(target=play, args=(index,),
+                                name='joueur-session-{}'.format(index))
+               for index in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    exit_code = error_code.NONE
+    won = 0
+    for index, result in enumerate(results):
+        if isinstance(result, error_code.SessionError):
+            exit_code = exit_code or result.error_code
+            summary = 'errored ({})'.format(result)
+        elif result is None:
+            exit_code = exit_code or error_code.DISCONNECTED_UNEXPECTEDLY
+            summary = 'did not finish'
+        else:
+            won += result[0]
+            summary = '{} because {}'.format('won' if result[0] else 'lost',
+                                             result[1])
+        print('{}Session {}: {}{}'.format(
+            color.text('cyan'), index, summary, color.reset()))
+
+    print('{}Played {} sessions in {:.2f} s, won {}{}'.format(
+        color.text('green'), sessions, time.perf_counter() - start, won,
+        color.reset()))
+    return exit_code
+
+
+def _numbered(path, index):
+    if not path:
+        return path
+    root, extension = os.path.splitext(path)
+    return '{}.{}{}'.format(root, index, extension)
@@ -0,0 +1,56 @@
+# LogBuffer: a game object's logs, keeping only the newest so a game that
+# logs a lot doesn't grow the client's memory without end. See --maxLogs in
+# main.py.
+
+
+class LogBuffer(list):
+    """The newest logs of a game object, at most capacity of them, as a list.
+
+    The server's list of logs only ever grows, and its deltas index into the
+    whole of it, so how many older logs were let go is kept as dropped: the
+    server's index of logs[i] is i + dropped.
+    """
+
+    __slots__ = ('capacity', 'dropped')
+
+    def __init__(self, capacity, logs=()):
+        list.__init__(self, logs)
+        self.capacity = capacity
+        self.dropped = 0
+        self._trim(len(self))
+
+    def merge(self, delta, list_length_key):
+        """Merges a delta of the server's list of logs into this.
+
+        Args:
+            delta (dict): the server's indexes (as strings) -> logs, and the
+                list's length under list_length_key
+            list_length_key (str): the key of the list's length
+        """
+        length = delta.get(list_length_key)
+        if length is not None:
+            self._trim(length)
+
+        dropped = self.dropped
+        for key, value in delta.items():
+            if key == list_length_key:
+                continue
+            index = int(key) - dropped
+            if 0 <= index < len(self):
+                self[index] = value
+
+    def _trim(self, length):
+        """Makes this the newest of a list of length logs, None until merged."""
+        kept = length - self.dropped
+        if kept < 0:  # shorter than what was already let go
+            del self[:]
+            self.dropped = length
+            return
+
+        del self[kept:]
+        excess = kept - self.capacity
+        if excess > 0:
+            del self[:excess]
+            self.dropped += excess
+            kept -= excess
+        self.extend([None] * (kept - len(self)))
@@ -0,0 +1,138 @@
+# Memory profiling: traces the client's allocations with tracemalloc as the
+# game is played, to find where memory goes before it blows up in an arena.
+# After each of the AI's turns it notes the process's peak RSS and how much
+# is traced, and every few turns it snapshots where the allocations are, by
+# module and by game object class. A report of it all, led by where memory
+# grew the most, is written when the game is over. See --memprofile in main.py.
+#
+# tracemalloc is process wide, and slows the client down while it traces.
+import os
+import sys
+import tracemalloc
+
+try:
+    import resource  # not on Windows
+except ImportError:
+    resource = None
+
+_TOP = 15  # rows of each table in the report
+
+
+class MemoryProfiler():
+    """Profiles memory turn by turn, see write() for the report."""
+
+    def __init__(self, path, every=10):
+        self.path = path
+        self.every = every
+        self._turns = []  # (turn, peak RSS, traced, traced peak in the turn)
+        # (turn, {module: bytes}, {class name: (count, size)}) of each
+        # snapshot, which aren't kept whole as they would be traced too
+        self._snapshots = []
+        self._first = None  # the first tracemalloc.Snapshot, to find growth from
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def turn_finished(self, game):
+        """Call after each of the AI's turns."""
+        traced, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        turn = game.current_turn
+        self._turns.append((turn, _peak_rss(), traced, peak))
+
+        if (len(self._turns) - 1) % self.every == 0:
+            self._snapshot(turn, game)
+
+    def _snapshot(self, turn, game):
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),  # this profiler's own
+        ))
+        self._snapshots.append((turn, _by_module(snapshot, _module_names()), _by_class(game)))
+        if self._first is None:
+            self._first = snapshot
+        return snapshot
+
+    def write(self, game):
+        """Writes the report to the path given, snapshotting one last time."""
+        last = self._snapshot(game.current_turn, game)
+        with open(self.path, 'w') as f:
+            f.write(self.report(last))
+
+    def report(self, last):
+        """The report as text, with growth up to the last snapshot."""
+        lines = []
+        first_turn = self._snapshots[0][0]
+        last_turn, last_modules, classes = self._snapshots[-1]
+
+        lines.append('Top growth sites, turn {} to turn {}'.format(first_turn, last_turn))
+        lines.append('{:>12} {:>10}  {}'.format('growth', 'blocks', 'site'))
+        for stat in last.compare_to(self._first, 'lineno')[:_TOP]:
+            frame = stat.traceback[0]
+            lines.append('{:>12} {:>+10}  {}:{}'.format(
+                _size(stat.size_diff, True), stat.count_diff, frame.filename, frame.lineno))
+
+        lines.append('')
+        # a column for each module with the most allocated by the end
+        modules = sorted(last_modules, key=lambda module: -last_modules[module])[:_TOP]
+        lines.append('Allocations by module')
+        lines.append('{:>8} {}'.format('turn', ' '.join('{:>24}'.format(module[-24:]) for module in modules)))
+        for turn, by_module, _ in self._snapshots:
+            lines.append('{:>8} {}'.format(turn, ' '.join(
+                '{:>24}'.format(_size(by_module.get(module, 0))) for module in modules)))
+
+        lines.append('')
+        lines.append('Game objects at turn {}'.format(last_turn))
+        lines.append('{:<16} {:>8} {:>12}'.format('class', 'count', 'size'))
+        for name, (count, size) in sorted(classes.items(), key=lambda item: -item[1][1]):
+            lines.append('{:<16} {:>8} {:>12}'.format(name, count, _size(size)))
+
+        lines.append('')
+        lines.append('Memory after each turn (peak RSS is the process\'s high water mark, traced includes the first snapshot)')
+        lines.append('{:>8} {:>12} {:>12} {:>12}'.format('turn', 'peak RSS', 'traced', 'turn peak'))
+        for turn, rss, traced, peak in self._turns:
+            lines.append('{:>8} {:>12} {:>12} {:>12}'.format(
+                turn, _size(rss) if rss is not None else '-', _size(traced), _size(peak)))
+        return '\n'.join(lines) + '\n'
+
+
+def _by_module(snapshot, modules):
+    """Bytes allocated by each module, e.g. 'joueur.game_manager'."""
+    totals = {}
+    for stat in snapshot.statistics('filename'):
+        filename = stat.traceback[0].filename
+        module = modules.get(filename) or os.path.basename(filename)
+        totals[module] = totals.get(module, 0) + stat.size
+    return totals
+
+
+def _module_names():
+    """Module file name -> module name, for the modules loaded."""
+    names = {}
+    for name, module in list(sys.modules.items()):
+        filename = getattr(module, '__file__', None)
+        if filename:
+            names[filename] = name
+    return names
+
+
+def _by_class(game):
+    """The count and shallow size of the game objects of each class. Not
+    their __dict__s, as asking for one can make it."""
+    classes = {}
+    for game_object in list(game.game_objects.values()):
+        name = game_object.__class__.__name__
+        size = sys.getsizeof(game_object)
+        count, total = classes.get(name, (0, 0))
+        classes[name] = (count + 1, total + size)
+    return classes
+
+
+def _peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # kilobytes elsewhere
+
+
+def _size(size, signed=False):
+    return '{}{:.1f} KiB'.format('+' if signed and size >= 0 else '', size / 1024)
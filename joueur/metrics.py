@@ -0,0 +1,159 @@
+# Metrics: low overhead histograms and counters of where the client spends
+# its time, dumped at the end of the game
+import json
+import math
+
+
+class Histogram():
+    """Counts values into logarithmic buckets, four per power of two, so
+    percentiles are accurate to within about 12% without storing values."""
+
+    _SUB_BUCKETS = 4
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self._buckets = {}
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+        if value > 0:
+            mantissa, exponent = math.frexp(value)  # mantissa in [0.5, 1)
+            bucket = exponent * self._SUB_BUCKETS + int(
+                (mantissa - 0.5) * 2 * self._SUB_BUCKETS)
+        else:
+            bucket = None
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    def _upper_bound(self, bucket):
+        if bucket is None:
+            return 0.0
+        exponent, sub = divmod(bucket, self._SUB_BUCKETS)
+        return math.ldexp(0.5 + (sub + 1) / (2.0 * self._SUB_BUCKETS), exponent)
+
+    def percentile(self, p):
+        """Gets the value p (0 to 1) of the observed values are at or under."""
+        if not self.count:
+            return None
+        rank = p * self.count
+        seen = 0
+        ordered = sorted(self._buckets, key=lambda b: -1e9 if b is None else b)
+        for bucket in ordered:
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                return min(max(self._upper_bound(bucket), self.min), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+        }
+
+
+class Metrics():
+    """Histograms and counters by name, each optionally split by a label."""
+
+    def __init__(self):
+        self.histograms = {}  # (name, label) -> Histogram
+        self.counters = {}  # (name, label) -> number
+
+    def observe(self, name, value, label=None):
+        histogram = self.histograms.get((name, label))
+        if histogram is None:
+            histogram = self.histograms[(name, label)] = Histogram()
+        histogram.observe(value)
+
+    def count(self, name, amount=1, label=None):
+        self.counters[(name, label)] = self.counters.get((name, label), 0) + amount
+
+    def to_dict(self):
+        return {
+            'histograms': [
+                dict(name=name, label=label, **histogram.to_dict())
+                for (name, label), histogram in sorted(self.histograms.items(), key=_by_key)
+            ],
+            'counters': [
+                {'name': name, 'label': label, 'value': value}
+                for (name, label), value in sorted(self.counters.items(), key=_by_key)
+            ],
+        }
+
+    def to_prometheus(self):
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+        typed = set()
+        for (name, label), histogram in sorted(self.histograms.items(), key=_by_key):
+            metric = 'joueur_' + name
+            if metric not in typed:
+                typed.add(metric)
+                lines.append('# TYPE {} summary'.format(metric))
+            for quantile in (0.5, 0.95, 0.99):
+                lines.append('{}{} {}'.format(metric, _labels(label, quantile),
+                                              histogram.percentile(quantile)))
+            lines.append('{}_sum{} {}'.format(metric, _labels(label), histogram.sum))
+            lines.append('{}_count{} {}'.format(metric, _labels(label), histogram.count))
+        for (name, label), value in sorted(self.counters.items(), key=_by_key):
+            metric = 'joueur_' + name
+            if metric not in typed:
+                typed.add(metric)
+                lines.append('# TYPE {} counter'.format(metric))
+            lines.append('{}{} {}'.format(metric, _labels(label), value))
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """Writes the metrics to path, as Prometheus text if it ends in .prom
+        or .txt and as JSON otherwise."""
+        with open(path, 'w') as f:
+            if path.endswith(('.prom', '.txt')):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+
+    def summary(self):
+        """A table of every histogram's percentiles, for the terminal."""
+        lines = ['{:<32} {:>8} {:>11} {:>11} {:>11} {:>11}'.format(
+            'metric', 'count', 'p50', 'p95', 'p99', 'max')]
+        for (name, label), histogram in sorted(self.histograms.items(), key=_by_key):
+            lines.append('{:<32} {:>8} {:>11} {:>11} {:>11} {:>11}'.format(
+                name + ('{' + label + '}' if label else ''), histogram.count,
+                *(_format(name, value) for value in (
+                    histogram.percentile(0.5), histogram.percentile(0.95),
+                    histogram.percentile(0.99), histogram.max))))
+        for (name, label), value in sorted(self.counters.items(), key=_by_key):
+            lines.append('{:<32} {:>8}'.format(
+                name + ('{' + label + '}' if label else ''), value))
+        return '\n'.join(lines)
+
+
+def _by_key(item):
+    name, label = item[0]
+    return (name, label or '')
+
+
+def _labels(label, quantile=None):
+    pairs = []
+    if label is not None:
+        pairs.append('label="{}"'.format(label))
+    if quantile is not None:
+        pairs.append('quantile="{}"'.format(quantile))
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format(name, value):
+    if name.endswith('_seconds'):
+        return '{:.3f} ms'.format(value * 1000)
+    return '{:.0f}'.format(value)
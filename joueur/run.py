@@ -3,19 +3,37 @@ import joueur.client
 import sys
 import joueur.error_code as error_code
 from joueur.game_manager import GameManager
+from joueur.gc_control import GcControl
+from joueur.memprofile import MemoryProfiler
+from joueur.session_log import ReplayTransport
 from joueur.utilities import camel_case_converter
 import joueur.ansi_color_coder as color
 
 
-def run(args):
+# plays one game session with args from main.py. The session is played on
+# client if given (see joueur/launcher.py), otherwise on the default client
+def run(args, client=None):
+    client = client or joueur.client._client
+
     split_server = args.server.split(":")
     args.server = split_server[0]
     args.port = int((len(split_server) == 2 and split_server[1])) or args.port
 
-    joueur.client.connect(args.server, args.port, args.print_io)
+    transport = args.transport
+    if args.replay:
+        # the server's side of the game comes from the log, no socket needed
+        transport = ReplayTransport(args.replay)
+
+    client.connect(args.server, args.port, args.print_io,
+                   transport, args.codec, args.record, args.metrics)
+    if args.gc:
+        client.gc_control = GcControl(args.gc, client.metrics)
+    if args.memprofile:
+        client.memory_profiler = MemoryProfiler(args.memprofile,
+                                                args.memprofile_every)
 
-    joueur.client.send("alias", args.game)
-    game_name = joueur.client.wait_for_event("named")
+    client.send("alias", args.game)
+    game_name = client.wait_for_event("named")
 
     module_str = "games." + camel_case_converter(game_name)
 
@@ -48,13 +66,13 @@ def run(args):
             'Probably a syntax error in your AI.'
         )
 
-    manager = GameManager(game)
+    manager = GameManager(game, args.slotted, args.max_logs)
 
-    joueur.client.setup(game, ai, manager)
+    client.setup(game, ai, manager)
 
     ai.set_settings(args.ai_settings)
 
-    joueur.client.send("play", {
+    client.send("play", {
         'gameName': game_name,
         'password': args.password,
         'requestedSession': args.session,
@@ -64,7 +82,7 @@ def run(args):
         'gameSettings': args.game_settings
     })
 
-    lobby_data = joueur.client.wait_for_event("lobbied")
+    lobby_data = client.wait_for_event("lobbied")
 
     print('{}In Lobby for game "{}" in session "{}".{}'.format(
             color.text("cyan"),
@@ -76,14 +94,14 @@ def run(args):
 
     manager.set_constants(lobby_data['constants'])
 
-    start_data = joueur.client.wait_for_event("start")
+    start_data = client.wait_for_event("start")
 
     print(color.text("green") + "Game is starting." + color.reset())
 
     ai.set_player(game.get_game_object(start_data['playerID']))
     try:
         ai.start()
-        ai.game_updated()
+        ai._game_updated(game.last_changes)
     except:
         error_code.handle_error(
             error_code.AI_ERRORED,
@@ -91,4 +109,8 @@ def run(args):
             'AI errored during game initialization'
         )
 
-    joueur.client.play()
+    if client.gc_control:
+        client.gc_control.game_started()
+
+    client.play()
+    return client.result
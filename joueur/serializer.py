@@ -1,4 +1,5 @@
 # Serializer: functions to serialize and unserialize json communication strings
+import json
 from joueur.base_game_object import BaseGameObject
 
 def is_game_object_reference(d):
@@ -14,6 +15,10 @@ def serialize(data):
     if isinstance(data, BaseGameObject):
         return {'id': data.id}
 
+    if isinstance(data, list):
+        return [serialize(value) if is_object(value) else value
+                for value in data]
+
     serialized = {}
     for key in data:
         value = data[key]
@@ -40,3 +45,66 @@ def deserialize(data, game):
             deserialized[key] = value
 
     return deserialized
+
+
+_encoded_references = {}
+
+## encodes a single value of a run frame straight to json
+def _encode_value(value):
+    if isinstance(value, BaseGameObject):
+        # ids never change, so each reference only needs encoding once
+        id = value.id
+        encoded = _encoded_references.get(id)
+        if encoded is None:
+            encoded = '{"id":' + json.dumps(id) + '}'
+            _encoded_references[id] = encoded
+        return encoded
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if value is None:
+        return 'null'
+    if type(value) is int:
+        return str(value)
+    return json.dumps(serialize(value))
+
+# @class RunFrameTemplate: the json of a 'run' event for one function, with
+# the parts that never change between calls already encoded
+class RunFrameTemplate():
+    def __init__(self, function_name, arg_names):
+        self.arg_names = tuple(arg_names)
+
+        # the constant json around each value, in order: sentTime, caller,
+        # then each arg
+        keys = [json.dumps(name) + ':' for name in self.arg_names]
+        self._constants = [
+            '{"sentTime":',
+            ',"event":"run","data":{"caller":',
+            ',"functionName":' + json.dumps(function_name) + ',"args":{' +
+            (keys[0] if keys else '}}}'),
+        ]
+        self._constants.extend(',' + key for key in keys[1:])
+        if keys:
+            self._constants.append('}}}')
+
+    def encode(self, sent_time, caller, args):
+        constants = self._constants
+        pieces = [constants[0], str(sent_time), constants[1],
+                  _encode_value(caller), constants[2]]
+        for i, name in enumerate(self.arg_names, 3):
+            pieces.append(_encode_value(args[name]))
+            pieces.append(constants[i])
+        return ''.join(pieces)
+
+_run_templates = {}
+
+## encodes the 'run' event for caller.function_name(**args) to json, the same
+## as serializing it would, re-using the template for that class and function
+def encode_run(sent_time, caller, function_name, args):
+    key = (caller.__class__, function_name)
+    template = _run_templates.get(key)
+    if template is None or template.arg_names != tuple(args):
+        template = RunFrameTemplate(function_name, args)
+        _run_templates[key] = template
+    return template.encode(sent_time, caller, args)
@@ -0,0 +1,142 @@
+# Session logs: every frame exchanged with the server, recorded with
+# monotonic timestamps so a game can be replayed later without a server.
+#
+# The log is a header followed by one record per frame, appended as they
+# happen: a direction byte ('>' sent to the server, '<' received from it),
+# the seconds since the session started as a double, the frame's length as
+# an unsigned int, then the frame's UTF-8 bytes without its EOT.
+import json
+import struct
+import time
+from joueur.transport import TransportClosed
+
+MAGIC = b'JSL1'
+SENT = b'>'
+RECEIVED = b'<'
+EOT_BYTE = b'\x04'
+
+_record = struct.Struct('<cdI')
+
+
+class SessionRecorder():
+    """Appends every frame sent or received to a session log."""
+
+    def __init__(self, path):
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._start = time.monotonic()
+
+    def record(self, direction, frame):
+        """Records one frame.
+
+        Args:
+            direction (bytes): SENT or RECEIVED
+            frame (bytes): the frame, without its EOT
+        """
+        self._file.write(_record.pack(
+            direction, time.monotonic() - self._start, len(frame)))
+        self._file.write(frame)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_session_log(path):
+    """Reads a session log.
+
+    Returns:
+        list[tuple]: (direction, seconds, frame bytes) for every record
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('"{}" is not a session log'.format(path))
+
+    records = []
+    offset = len(MAGIC)
+    while offset + _record.size <= len(data):
+        direction, seconds, length = _record.unpack_from(data, offset)
+        offset += _record.size
+        records.append((direction, seconds, data[offset:offset + length]))
+        offset += length
+    return records
+
+
+class ReplayTransport():
+    """Plays the server's side of a recorded session back, no socket needed.
+
+    Each time the client waits on the server it gets the next frames that
+    were received in the recording, up to the next frame the client sent.
+    What the client sends is compared to what it sent in the recording
+    (ignoring sentTime), so an AI that no longer plays the same way shows
+    up as diverged frames.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._records = []
+        self._position = 0
+        self._sent = 0
+        self._diverged = 0
+        self._start = None
+
+    def connect(self, hostname, port):
+        try:
+            self._records = read_session_log(self._path)
+        except ValueError as e:
+            raise OSError(str(e))
+        self._start = time.perf_counter()
+
+    def send(self, data):
+        for frame in data.split(EOT_BYTE)[:-1]:
+            expected = self._next_sent()
+            self._sent += 1
+            if expected is None or _without_time(frame) != _without_time(expected):
+                self._diverged += 1
+
+    def _next_sent(self):
+        records = self._records
+        while self._position < len(records):
+            direction, _, frame = records[self._position]
+            self._position += 1
+            if direction == SENT:
+                return frame
+            # frames received that the client never waited for are skipped
+
+    def recv_frames(self):
+        records = self._records
+        frames = []
+        while self._position < len(records):
+            direction, _, frame = records[self._position]
+            if direction != RECEIVED:
+                if frames:
+                    break
+                # the client is waiting before sending what it sent in the
+                # recording, it can only have diverged
+                self._position += 1
+                self._diverged += 1
+                continue
+            frames.append(frame.decode('utf-8'))
+            self._position += 1
+
+        if not frames:
+            raise TransportClosed()
+        return frames
+
+    def close(self):
+        if self._start is None:
+            return
+
+        recorded = self._records[-1][1] if self._records else 0.0
+        print('Replayed {} frames of "{}" in {:.3f} s (recorded over {:.3f} s), {} of {} sent frames diverged'.format(
+            len(self._records), self._path, time.perf_counter() - self._start,
+            recorded, self._diverged, self._sent))
+        self._start = None
+
+
+def _without_time(frame):
+    parsed = json.loads(frame.decode('utf-8'))
+    parsed.pop('sentTime', None)
+    return parsed
@@ -0,0 +1,80 @@
+# Slotted game object classes: the same classes a game defines, rebuilt with
+# __slots__ so instances have no per-instance __dict__, and with each
+# read-only property reading the slot it is named after in C, so `tile.x`
+# costs little more than `tile._x`. GameManager creates these instead when
+# asked to, see GameManager(game, slotted=True).
+#
+# They can't subclass the game's classes, as instances of a subclass of a
+# class without __slots__ still get a __dict__. Instead their __class__ is
+# the game's class, so isinstance(tile, Tile) holds for a slotted Tile too,
+# as it does for the plain one. type(tile) is still the slotted class.
+from operator import attrgetter
+from joueur.base_game_object import BaseGameObject
+
+_slotted = {}  # plain class -> its slotted variant, shared by every game
+
+
+def slotted_classes(classes):
+    """Gets the slotted variants of a game's game object classes.
+
+    Args:
+        classes (dict): game object name -> plain class, as in
+            Game._game_object_classes
+
+    Returns:
+        dict: game object name -> slotted class
+    """
+    return {name: slotted_class(cls) for name, cls in classes.items()}
+
+
+def slotted_class(cls):
+    """Gets the slotted variant of one game object class, built the first
+    time it is asked for. It is still a BaseGameObject, and has the same
+    methods, but is not a subclass of cls: its instances give cls as their
+    __class__ so isinstance checks against cls still hold."""
+    if cls in _slotted:
+        return _slotted[cls]
+    if cls is BaseGameObject or not issubclass(cls, BaseGameObject):
+        return cls
+
+    bases = tuple(slotted_class(base) for base in cls.__bases__)
+    inherited = {name for base in bases for ancestor in base.__mro__
+                 for name in vars(ancestor).get('__slots__', ())}
+
+    slots = [name for name in sorted(vars(cls())) if name not in inherited]
+    if BaseGameObject in bases:
+        slots.append('_client')  # set by GameManager, see DeltaMergeable
+
+    namespace = {key: value for key, value in vars(cls).items()
+                 if key not in ('__dict__', '__weakref__')}
+    namespace['__slots__'] = tuple(slots)
+    namespace['__class__'] = property(lambda self: cls)
+
+    # the generated properties only return the slot they're named after, so
+    # an attrgetter does the same without calling into Python, and like them
+    # has no setter, so the fields stay read only
+    for name, value in vars(cls).items():
+        if isinstance(value, property) and '_' + name in slots:
+            namespace[name] = property(attrgetter('_' + name), doc=value.__doc__)
+    slotted = type(cls.__name__, bases, namespace)
+
+    _slotted[cls] = slotted
+    return slotted
+
+
+def fields_of(obj):
+    """Gets the attributes an instance holds and their values, whether its
+    class is slotted or not.
+
+    Returns:
+        dict: attribute name -> value
+    """
+    if hasattr(obj, '__dict__'):
+        return dict(vars(obj))
+
+    fields = {}
+    for cls in type(obj).__mro__:
+        for name in cls.__dict__.get('__slots__', ()):
+            if hasattr(obj, name):
+                fields[name] = getattr(obj, name)
+    return fields
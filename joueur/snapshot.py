@@ -0,0 +1,91 @@
+# Snapshots: cheap "what if" changes to the live game state. Nothing is copied
+# when a snapshot is taken; each write made while it is open is journaled
+# with the value it replaced, so rolling back undoes exactly those writes.
+# Lists and dicts are copied only when first changed (copy-on-write).
+
+_MISSING = object()  # journaled for attributes that did not exist before
+
+
+class Snapshot():
+    """An open snapshot of a game's state, see BaseGame.snapshot().
+
+    Use it in a `with` statement to roll back when the block exits.
+    """
+
+    def __init__(self, game, mark):
+        self._game = game
+        self._mark = mark  # the journal's length when taken
+        self._copied = set()  # (id(obj), attribute) of fields copied in this snapshot
+        self.open = True
+
+    def set(self, obj, field, value):
+        """Same as game.set_field(obj, field, value)."""
+        set_field(self._game, obj, field, value)
+
+    def mutable(self, obj, field):
+        """Same as game.mutable_field(obj, field)."""
+        return mutable_field(self._game, obj, field)
+
+    def rollback(self):
+        """Undoes every write made since this snapshot was taken."""
+        rollback(self._game, self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        rollback(self._game, self)
+
+
+def take(game):
+    snapshot = Snapshot(game, len(game._journal))
+    game._snapshots.append(snapshot)
+    return snapshot
+
+
+def rollback(game, snapshot=None):
+    if snapshot is None:
+        if not game._snapshots:
+            return
+        snapshot = game._snapshots[0]
+    if not snapshot.open:
+        return
+
+    index = game._snapshots.index(snapshot)
+    for closing in game._snapshots[index:]:
+        closing.open = False
+    del game._snapshots[index:]
+
+    journal = game._journal
+    while len(journal) > snapshot._mark:
+        obj, attribute, previous = journal.pop()
+        if previous is _MISSING:
+            delattr(obj, attribute)
+        else:
+            setattr(obj, attribute, previous)
+
+
+def _innermost(game):
+    if not game._snapshots:
+        raise RuntimeError('The game state can only be changed inside a snapshot, see BaseGame.snapshot().')
+    return game._snapshots[-1]
+
+
+def set_field(game, obj, field, value):
+    _innermost(game)
+    attribute = '_' + field
+    game._journal.append((obj, attribute, getattr(obj, attribute, _MISSING)))
+    setattr(obj, attribute, value)
+
+
+def mutable_field(game, obj, field):
+    snapshot = _innermost(game)
+    attribute = '_' + field
+    current = getattr(obj, attribute)
+    key = (id(obj), attribute)
+    if key not in snapshot._copied:
+        snapshot._copied.add(key)
+        game._journal.append((obj, attribute, current))
+        current = current.copy()
+        setattr(obj, attribute, current)
+    return current
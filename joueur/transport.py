@@ -0,0 +1,61 @@
+# Transports: move raw bytes between the client and the server. Every
+# transport has the same interface so the client doesn't care which it has:
+#     connect(hostname, port)
+#     send(data)      sends all of the bytes to the server
+#     recv_frames()   blocks until at least one complete frame arrived and
+#                     returns all complete frames (as str)
+#     close()
+import socket
+from joueur.frame_decoder import FrameDecoder
+
+
+# raised by a transport once the server closes the connection
+class TransportClosed(Exception):
+    pass
+
+
+class SocketTransport():
+    """A blocking socket that polls on a timeout, so keyboard and other system
+    interrupts can still be handled while waiting on the server."""
+
+    def __init__(self, timeout_time=1.0):
+        self._socket = None
+        self._timeout_time = timeout_time
+        self._decoder = FrameDecoder()
+
+    def connect(self, hostname, port):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+        # Silly Windows
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+        # command frames are small and we wait on their replies, so don't let
+        # Nagle's algorithm hold them back
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        # so the blocking on recv doesn't hang forever and other system
+        # interrupts (e.g. keyboard) can be handled
+        self._socket.settimeout(self._timeout_time)
+        self._socket.connect((hostname, port))
+
+    def send(self, data):
+        self._socket.sendall(data)
+
+    def recv_frames(self):
+        while True:
+            try:
+                received = self._socket.recv(self._decoder.recv_size)
+            except socket.timeout:
+                continue  # timed out so keyboard/system interrupts can be handled
+
+            if not received:
+                raise TransportClosed()
+
+            # only complete frames come back, anything partial is buffered
+            frames = self._decoder.feed(received)
+            if frames:
+                return frames
+
+    def close(self):
+        if self._socket:
+            self._socket.close()
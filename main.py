@@ -2,7 +2,9 @@
 # Instead have a look at `README.md` for how to start writing you AI.
 
 import argparse
+import sys
 from joueur.run import run
+from joueur.launcher import launch
 
 parser = argparse.ArgumentParser(description='Runs the python client with options. Must provide a game name to play on the server.')
 parser.add_argument('game', action='store', help='the name of the game you want to play on the server')
@@ -14,6 +16,20 @@ parser.add_argument('-w, --password', action='store', dest='password', default=N
 parser.add_argument('-r, --session', action='store', dest='session', default='*', help='the requested game session you want to play on the server')
 parser.add_argument('--gameSettings', action='store', dest='game_settings', default=None, help='Any settings for the game server to force. Must be query string formatted (key=value&otherKey=otherValue)')
 parser.add_argument('--aiSettings', action='store', dest='ai_settings', default=None, help='Any settings for the AI. Delimit pairs by an ampersand (key=value&otherKey=otherValue)')
+parser.add_argument('--transport', action='store', dest='transport', default='asyncio', choices=['asyncio', 'socket'], help='how to talk to the server: an asyncio event loop in a background thread, or a plain blocking socket')
+parser.add_argument('--codec', action='store', dest='codec', default=None, choices=['orjson', 'json'], help='the JSON library to talk to the server with, by default the fastest one installed')
+parser.add_argument('--record', action='store', dest='record', default=None, metavar='FILE', help='record every frame sent to and received from the server to FILE')
+parser.add_argument('--replay', action='store', dest='replay', default=None, metavar='FILE', help='replay a game recorded with --record from FILE instead of connecting to a server')
+parser.add_argument('--metrics', action='store', dest='metrics', default=None, metavar='FILE', help='time commands, deltas and turns, dumping the histograms to FILE (Prometheus text if it ends in .prom or .txt, JSON otherwise) when the game is over')
+parser.add_argument('--slotted', action='store_true', dest='slotted', help='create game objects from slotted variants of the game\'s classes, which use less memory and read fields faster')
+parser.add_argument('--maxLogs', action='store', dest='max_logs', type=int, default=1000, metavar='N', help='keep only the newest N logs of each game object, 0 to keep them all')
+parser.add_argument('--gc', action='store', dest='gc', default=None, choices=['report', 'freeze', 'turns'], help='keep the garbage collector from pausing the AI\'s turns: freeze the game\'s objects once it starts and collect less during turns, or (turns) not at all during turns, collecting while the opponent plays instead. The pauses seen are reported when the game is over, which is all report does')
+parser.add_argument('--memprofile', action='store', dest='memprofile', default=None, metavar='FILE', help='trace memory with tracemalloc as the game is played, writing a report of where it grew, by module and by game object class, and the peak RSS after each turn to FILE when the game is over')
+parser.add_argument('--memprofileEvery', action='store', dest='memprofile_every', type=int, default=10, metavar='N', help='with --memprofile, snapshot the allocations every N turns')
+parser.add_argument('--sessions', action='store', dest='sessions', type=int, default=1, metavar='N', help='play N sessions at once in this one process, each with its own connection')
 parser.add_argument('--printIO', action='store_true', dest='print_io', help='(debugging) print IO through the TCP socket to the terminal')
 
-run(parser.parse_args())
+args = parser.parse_args()
+if args.sessions > 1:
+    sys.exit(launch(args, args.sessions))
+run(args)
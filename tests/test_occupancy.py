@@ -0,0 +1,79 @@
+# Tests that Game.occupancy_version goes up whenever a delta changes what is
+# on a Tile, so DistanceFields built for the old occupancy are thrown away,
+# for game objects made from the plain classes and from the slotted ones.
+#
+# Run from the root of the client:
+#     python3 -m pytest tests
+
+import random
+import pytest
+from joueur.game_manager import GameManager
+from games.stumped import Game
+from games.stumped.ai import move_cost
+from games.stumped.distance_field import DistanceFields
+from games.stumped.graph import Graph
+from games.stumped.local_server import (
+    DELTA_LIST_LENGTH, DELTA_REMOVED, InvalidCommand, StumpedGame)
+
+
+def played_deltas(turns, seed=1):
+    """The deltas of a 12x12 game where both players recruit and move their
+    beavers at random, one delta per command."""
+    rng = random.Random(seed)
+    server = StumpedGame('test', ['a', 'b'], 12, 12, turns * 2, seed=seed)
+    yield server.pop_delta()
+
+    def run(player, caller, function_name, **args):
+        try:
+            server.run(player, caller, function_name,
+                       {key: {'id': value.id} for key, value in args.items()})
+        except InvalidCommand:
+            return None
+        return server.pop_delta()
+
+    for _ in range(turns):
+        if server.over:
+            break
+        player = server.current_player
+        yield run(player, rng.choice(server.jobs), 'recruit', tile=player.lodges[0])
+        for beaver in list(player.beavers):
+            neighbors = [server.tile_at(beaver.tile.x + dx, beaver.tile.y + dy)
+                         for dx, dy in ((0, -1), (1, 0), (0, 1), (-1, 0))]
+            yield run(player, beaver, 'move', tile=rng.choice([tile for tile in neighbors if tile]))
+        server.end_turn()
+        yield server.pop_delta()
+
+
+def occupants(game):
+    return [(tile._beaver, tile._spawner, tile._lodge_owner) for tile in game.tiles]
+
+
+@pytest.mark.parametrize('slotted', [False, True], ids=['plain', 'slotted'])
+def test_occupancy_version_invalidates_distance_fields(slotted):
+    game = Game()
+    manager = GameManager(game, slotted=slotted)
+    manager.set_constants({'DELTA_REMOVED': DELTA_REMOVED, 'DELTA_LIST_LENGTH': DELTA_LIST_LENGTH})
+    deltas = played_deltas(30)
+    manager.apply_delta_state(next(deltas))
+
+    graph = Graph(game, move_cost)
+    fields = DistanceFields(graph)
+    goals = [spawner.tile for spawner in game.spawner]
+
+    moves = 0
+    for delta in deltas:
+        if not delta:
+            continue
+        before, version = occupants(game), game.occupancy_version()
+        fields.field(goals).cost(game.tiles[0])  # cached for the occupancy before the delta
+        manager.apply_delta_state(delta)
+
+        if occupants(game) != before:
+            moves += 1
+            assert game.occupancy_version() > version
+        # cached or not, the field has to be for the game as it is now
+        cached = fields.field(goals)
+        fresh = DistanceFields(graph).field(goals)
+        assert [cached.cost(tile) for tile in game.tiles] == [fresh.cost(tile) for tile in game.tiles]
+
+    assert moves > 10  # enough beavers moved for the test to mean anything